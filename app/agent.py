@@ -1,56 +1,127 @@
-import os
-from typing import Annotated, Literal, TypedDict, Any
-from pydantic import SecretStr
-from langchain_openai import ChatOpenAI
+import time
+import asyncio
+import inspect
+import operator
+from typing import Annotated, Literal, TypedDict, Any, Awaitable, Callable
 from langchain_core.messages import HumanMessage, SystemMessage
-from langgraph.graph import StateGraph, END
+from langchain_core.runnables import RunnableConfig
+from langgraph.graph import StateGraph, START, END
+from langgraph.types import Send
 from langgraph.graph.message import add_messages
 from dotenv import load_dotenv
 
-from app.models import TutorStep
-from app.assessment_generator import AssessmentGenerator
+from app.models import TutorStep, Difficulty
+from app.assessment_generator import AssessmentGenerator, _ensure_string_content
+from app.step_cache import StepCache, step_cache_key
+from app.context_budget import summarize_step
+from app.llm_gateway import get_default_gateway
+from app.metrics import metrics, NODE_SECONDS
 
 load_dotenv()
 
+QUESTION_COUNT = 5
+QUESTIONS_PER_STEP = 2
+
+DEFAULT_LESSON_STEPS = 5
+MAX_LESSON_STEPS = 20
+DIFFICULTY_GUIDANCE = {
+    "easy": "Assume no prior knowledge, use plain language and simple examples.",
+    "medium": "Assume basic familiarity with programming concepts.",
+    "hard": "Assume a confident learner; go into edge cases and trade-offs."
+}
+
+# Bump whenever the teaching prompts change so cached steps are not reused.
+PROMPT_VERSION = "2"
+
+DELTA_MIN_CHARS = 64
+DELTA_FLUSH_INTERVAL = 0.05
+
+DeltaCallback = Callable[[int, str], Awaitable[None]]
+
+
+def _highest(current: int, update: int) -> int:
+    return max(current, update)
+
 
 class AgentState(TypedDict):
-    """State for LangGraph agent."""
+    """State for LangGraph agent.
+
+    Nodes return only the keys they change; messages and steps_completed are
+    appended by their reducers rather than copied by each node. current_step
+    keeps the highest step taught, as parallel branches each report their own.
+    cache_topic is the canonical topic that cached steps are stored under.
+    """
     messages: Annotated[list, add_messages]
     topic: str
-    current_step: int
-    steps_completed: list
+    cache_topic: str
+    total_steps: int
+    difficulty: Difficulty
+    current_step: Annotated[int, _highest]
+    steps_completed: Annotated[list, operator.add]
     assessment_generated: bool
     assessment: dict | None
     session_id: str
 
 
 class TutorAgent:
-    """LangGraph-based tutor agent that teaches in 5 steps."""
-    
-    def __init__(self):
-        api_key = os.getenv("OPENAI_API_KEY")
-        self.llm = ChatOpenAI(
-            model="gpt-4",
-            temperature=0.7,
-            api_key=SecretStr(api_key) if api_key else None
-        )
-        self.assessment_generator = AssessmentGenerator()
-        self.graph = self._build_graph()
+    """LangGraph-based tutor agent that teaches a topic in a configurable number of steps."""
     
-    def _build_graph(self) -> Any:
+    def __init__(
+        self,
+        llm: Any = None,
+        assessment_generator: AssessmentGenerator | None = None,
+        step_cache: StepCache | None = None,
+        max_parallel_steps: int = 5,
+        checkpointer: Any = None
+    ):
+        if llm is None:
+            llm = get_default_gateway().chat_model("gpt-4", temperature=0.7)
+        self.llm = llm
+        self.model_name = getattr(llm, "model_name", None) or type(llm).__name__
+        self.assessment_generator = assessment_generator or AssessmentGenerator()
+        self.step_cache = step_cache
+        self.max_parallel_steps = max_parallel_steps
+        self.checkpointer = checkpointer
+        self._step_questions: dict[str, list[asyncio.Task]] = {}
+        self._graphs: dict[tuple, Any] = {}
+    
+    def set_checkpointer(self, checkpointer: Any) -> None:
+        # Compiled graphs hold on to their checkpointer, so they are rebuilt.
+        self.checkpointer = checkpointer
+        self._graphs.clear()
+    
+    def graph_for(self, parallel: bool = False) -> Any:
+        # Lesson length and difficulty travel in the state, so only options that
+        # change the graph's shape are part of the key and every lesson reuses
+        # one of a handful of compiled graphs.
+        key = (parallel,)
+        graph = self._graphs.get(key)
+        if graph is None:
+            graph = self._build_graph(parallel=parallel)
+            self._graphs[key] = graph
+        return graph
+    
+    def _build_graph(self, parallel: bool = False) -> Any:
         workflow = StateGraph(AgentState)
         
-        workflow.add_node("teach_step", self._teach_step)
-        workflow.add_node("check_completion", self._check_completion)
-        workflow.add_node("generate_assessment", self._generate_assessment_tool)
-        workflow.add_node("complete", self._complete_session)
+        workflow.add_node("teach_step", self._timed("teach_step", self._teach_step))
+        workflow.add_node("check_completion", self._timed("check_completion", self._check_completion))
+        workflow.add_node("generate_assessment", self._timed("generate_assessment", self._generate_assessment_tool))
+        workflow.add_node("complete", self._timed("complete", self._complete_session))
         
-        workflow.set_entry_point("teach_step")
-        workflow.add_conditional_edges(
-            "teach_step",
-            self._should_continue,
-            {"continue": "teach_step", "check": "check_completion"}
-        )
+        if parallel:
+            # Every remaining step is its own teach_step branch, so each one is
+            # checkpointed as soon as it finishes and a resumed lesson only
+            # generates the steps that are still missing.
+            workflow.add_conditional_edges(START, self._fan_out_steps, ["teach_step", "check_completion"])
+            workflow.add_edge("teach_step", "check_completion")
+        else:
+            workflow.set_entry_point("teach_step")
+            workflow.add_conditional_edges(
+                "teach_step",
+                self._should_continue,
+                {"continue": "teach_step", "check": "check_completion"}
+            )
         workflow.add_conditional_edges(
             "check_completion",
             self._should_generate_assessment,
@@ -59,21 +130,103 @@ class TutorAgent:
         workflow.add_edge("generate_assessment", "complete")
         workflow.add_edge("complete", END)
         
-        return workflow.compile()
+        return workflow.compile(checkpointer=self.checkpointer)
     
-    def _teach_step(self, state: AgentState) -> AgentState:
+    def _timed(self, name: str, node: Callable) -> Callable:
+        # Wrapped only when metrics are on, so disabled metrics cost nothing per node.
+        if not metrics.enabled:
+            return node
+        takes_config = "config" in inspect.signature(node).parameters
+        
+        if inspect.iscoroutinefunction(node):
+            async def run_async(state: AgentState, config: RunnableConfig) -> dict:
+                with NODE_SECONDS.time(name):
+                    return await (node(state, config) if takes_config else node(state))
+            return run_async
+        
+        def run(state: AgentState, config: RunnableConfig) -> dict:
+            with NODE_SECONDS.time(name):
+                return node(state, config) if takes_config else node(state)
+        return run
+    
+    async def _teach_step(self, state: AgentState, config: RunnableConfig) -> dict:
         current_step = state.get("current_step", 0)
         topic = state.get("topic", "")
         
-        if current_step >= 5:
-            return state
+        if current_step >= self._total_steps(state):
+            return {}
         
         step_number = current_step + 1
+        step_content = await self._generate_step_content(state, step_number, config)
+        
+        step = self._build_step(topic, step_number, step_content)
+        self._start_step_questions(state, step, config)
+        
+        return {
+            "current_step": step_number,
+            "steps_completed": [step],
+            "messages": [{"role": "assistant", "content": step_content, "step": step_number}]
+        }
+    
+    def _fan_out_steps(self, state: AgentState) -> list[Any] | str:
+        # Steps do not depend on each other's content, so each branch sees the
+        # lesson as if the steps before its own were already taught.
+        current_step = state.get("current_step", 0)
+        total_steps = self._total_steps(state)
+        if current_step >= total_steps:
+            return "check_completion"
+        return [
+            Send("teach_step", {**state, "current_step": step_number - 1})
+            for step_number in range(current_step + 1, total_steps + 1)
+        ]
+    
+    def _build_step(self, topic: str, step_number: int, step_content: str) -> dict:
+        return TutorStep(
+            step_number=step_number,
+            title=f"Step {step_number}: Introduction to {topic}",
+            content=step_content,
+            is_complete=True,
+            summary=summarize_step(step_content)
+        ).model_dump()
+    
+    def _start_step_questions(self, state: AgentState, step: dict, config: RunnableConfig) -> None:
+        # Pipelined assessment: questions for a step are generated while later
+        # steps are still being taught, then merged in _generate_assessment_tool.
+        if not (config or {}).get("configurable", {}).get("pipeline_assessment"):
+            return
+        
+        # Short lessons ask for more questions per step so the merge can still
+        # fill a full assessment.
+        count = max(QUESTIONS_PER_STEP, -(-QUESTION_COUNT // self._total_steps(state)))
+        task = asyncio.create_task(self.assessment_generator.generate_step_questions(
+            state.get("topic", ""), step, count, state.get("difficulty", "medium")
+        ))
+        self._step_questions.setdefault(state.get("session_id", ""), []).append(task)
+    
+    async def _generate_step_content(self, state: AgentState, step_number: int, config: RunnableConfig) -> str:
+        configurable = (config or {}).get("configurable", {})
+        on_delta = configurable.get("on_delta")
+        topic = state.get("topic", "")
+        total_steps = self._total_steps(state)
+        difficulty = state.get("difficulty", "medium")
+        
+        cache_key = None
+        if self.step_cache is not None:
+            cache_key = step_cache_key(
+                state.get("cache_topic") or topic, step_number, self.model_name, PROMPT_VERSION, total_steps, difficulty
+            )
+            cached = self.step_cache.get(cache_key) if configurable.get("use_cache", True) else None
+            if cached is not None:
+                if on_delta is not None:
+                    await on_delta(step_number, cached)
+                return cached
+        
         system_prompt = (
             f"You are a helpful tutor teaching the topic: {topic}. "
-            f"You are currently on step {step_number} of 5. "
+            f"You are currently on step {step_number} of {total_steps}. "
             "Each step should build on the previous ones and be clear and concise. "
-            "Provide educational content that progressively teaches the topic."
+            "Provide educational content that progressively teaches the topic. "
+            f"{DIFFICULTY_GUIDANCE.get(difficulty, DIFFICULTY_GUIDANCE['medium'])}"
         )
         
         messages = [
@@ -82,78 +235,124 @@ class TutorAgent:
                                 f"Make it clear, educational, and build on previous steps.")
         ]
         
-        response = self.llm.invoke(messages)
-        step_content = response.content
-        if isinstance(step_content, list):
-            step_content = " ".join(str(item) for item in step_content)
-        elif not isinstance(step_content, str):
-            step_content = str(step_content)
+        if on_delta is None:
+            response = await self.llm.ainvoke(messages)
+            step_content = _ensure_string_content(response.content)
+        else:
+            step_content = await self._stream_step_content(messages, step_number, on_delta)
         
-        tutor_step = TutorStep(
-            step_number=step_number,
-            title=f"Step {step_number}: Introduction to {topic}",
-            content=step_content,
-            is_complete=True
-        )
+        if cache_key is not None and self.step_cache is not None:
+            self.step_cache.set(cache_key, step_content)
         
-        steps_completed = state.get("steps_completed", [])
-        steps_completed.append(tutor_step.model_dump())
+        return step_content
+    
+    async def _stream_step_content(self, messages: list, step_number: int, on_delta: DeltaCallback) -> str:
+        # Tokens are batched into frames so a fast model does not turn into one
+        # WebSocket send per token; the first chunk is always flushed immediately.
+        parts: list[str] = []
+        buffer: list[str] = []
+        buffered = 0
+        last_flush = 0.0
         
-        return {
-            **state,
-            "current_step": step_number,
-            "steps_completed": steps_completed,
-            "messages": state.get("messages", []) + [
-                {"role": "assistant", "content": step_content, "step": step_number}
-            ]
-        }
+        async for chunk in self.llm.astream(messages):
+            text = _ensure_string_content(chunk.content)
+            if not text:
+                continue
+            parts.append(text)
+            buffer.append(text)
+            buffered += len(text)
+            
+            now = time.monotonic()
+            if buffered >= DELTA_MIN_CHARS or now - last_flush >= DELTA_FLUSH_INTERVAL:
+                await on_delta(step_number, "".join(buffer))
+                buffer.clear()
+                buffered = 0
+                last_flush = now
+        
+        if buffer:
+            await on_delta(step_number, "".join(buffer))
+        
+        return "".join(parts)
     
     def _should_continue(self, state: AgentState) -> Literal["continue", "check"]:
-        return "continue" if state.get("current_step", 0) < 5 else "check"
+        return "continue" if state.get("current_step", 0) < self._total_steps(state) else "check"
+    
+    def _total_steps(self, state: AgentState) -> int:
+        return state.get("total_steps") or DEFAULT_LESSON_STEPS
     
-    def _check_completion(self, state: AgentState) -> AgentState:
-        return state
+    def _check_completion(self, state: AgentState) -> dict:
+        return {}
     
     def _should_generate_assessment(self, state: AgentState) -> Literal["generate", "complete"]:
         return "generate" if not state.get("assessment_generated", False) else "complete"
     
-    def _generate_assessment_tool(self, state: AgentState) -> AgentState:
+    async def _generate_assessment_tool(self, state: AgentState) -> dict:
         from app.models import AssessmentGenerationRequest
         
-        request = AssessmentGenerationRequest(
-            topic=state.get("topic", ""),
-            question_count=5,
-            difficulty="medium",
-            teaching_steps=state.get("steps_completed", [])
-        )
+        assessment = None
+        pending = self._step_questions.pop(state.get("session_id", ""), [])
+        if pending:
+            results = await asyncio.gather(*pending, return_exceptions=True)
+            question_groups = [r for r in results if isinstance(r, list)]
+            merged = self.assessment_generator.merge_step_questions(
+                state.get("topic", ""), question_groups, QUESTION_COUNT
+            )
+            if len(merged.questions) == QUESTION_COUNT:
+                assessment = merged
         
-        assessment = self.assessment_generator.generate_assessment(request)
+        if assessment is None:
+            request = AssessmentGenerationRequest(
+                topic=state.get("topic", ""),
+                question_count=QUESTION_COUNT,
+                difficulty=state.get("difficulty", "medium"),
+                teaching_steps=state.get("steps_completed", [])
+            )
+            assessment = await self.assessment_generator.generate_assessment(request)
         
         return {
-            **state,
             "assessment_generated": True,
             "assessment": assessment.model_dump(mode='json'),
-            "messages": state.get("messages", []) + [{
+            "messages": [{
                 "role": "assistant",
                 "content": f"Assessment generated for {state.get('topic', '')} with {len(assessment.questions)} questions.",
                 "type": "assessment_ready"
             }]
         }
     
-    def _complete_session(self, state: AgentState) -> AgentState:
+    def _complete_session(self, state: AgentState) -> dict:
         return {
-            **state,
-            "messages": state.get("messages", []) + [{
+            "messages": [{
                 "role": "assistant",
                 "content": "Teaching session completed. Assessment is ready!",
                 "type": "tutor_complete"
             }]
         }
     
-    async def stream_teaching(self, topic: str, session_id: str):
+    async def stream_teaching(
+        self,
+        topic: str,
+        session_id: str,
+        stream_tokens: bool = False,
+        use_cache: bool = True,
+        parallel: bool = False,
+        pipeline_assessment: bool = False,
+        total_steps: int = DEFAULT_LESSON_STEPS,
+        difficulty: Difficulty = "medium",
+        cache_topic: str | None = None
+    ):
+        # With a checkpointer, state is saved after every node under the
+        # session id, so it must be new for each lesson.
+        if not 1 <= total_steps <= MAX_LESSON_STEPS:
+            raise ValueError(f"Lesson length must be between 1 and {MAX_LESSON_STEPS} steps")
+        if difficulty not in DIFFICULTY_GUIDANCE:
+            raise ValueError(f"Difficulty must be one of: {', '.join(DIFFICULTY_GUIDANCE)}")
+        
         initial_state: AgentState = {
             "messages": [],
             "topic": topic,
+            "cache_topic": cache_topic or topic,
+            "total_steps": total_steps,
+            "difficulty": difficulty,
             "current_step": 0,
             "steps_completed": [],
             "assessment_generated": False,
@@ -161,24 +360,148 @@ class TutorAgent:
             "session_id": session_id
         }
         
-        last_step_count = 0
+        configurable: dict[str, Any] = {
+            "use_cache": use_cache,
+            "pipeline_assessment": pipeline_assessment,
+            "thread_id": session_id
+        }
+        # One super-step per taught step plus check, assessment and completion.
+        config: RunnableConfig = {"configurable": configurable, "recursion_limit": total_steps + 10}
+        if parallel:
+            config["max_concurrency"] = self.max_parallel_steps
+        
+        async for event in self._run_graph(self.graph_for(parallel), initial_state, config, session_id, stream_tokens):
+            yield event
+    
+    async def has_checkpoint(self, session_id: str, parallel: bool = False) -> bool:
+        if self.checkpointer is None:
+            return False
+        snapshot = await self.graph_for(parallel).aget_state({"configurable": {"thread_id": session_id}})
+        return bool(snapshot.values)
+    
+    async def resume_teaching(self, session_id: str, stream_tokens: bool = False, parallel: bool = False):
+        """Replay a checkpointed lesson and generate only what is still missing.
+        
+        Steps, the assessment and completion already in the checkpoint are
+        re-emitted without LLM calls; the graph then continues from the last
+        saved node, or in parallel mode re-runs only the step branches that had
+        not finished. Callers should check has_checkpoint() first.
+        """
+        graph = self.graph_for(parallel)
+        snapshot = await graph.aget_state({"configurable": {"thread_id": session_id}})
+        values = snapshot.values
+        if not values:
+            raise LookupError(f"No checkpoint for session {session_id}")
         
-        async for state_update in self.graph.astream(initial_state):
+        # In parallel mode the snapshot includes branches that finished out of
+        # order; only the unbroken run of steps is replayed here, and the rest
+        # come back through the graph's stream once the gap is filled.
+        next_step = 1
+        for step in sorted(values.get("steps_completed", []), key=lambda s: s["step_number"]):
+            if step["step_number"] != next_step:
+                break
+            yield self._step_event(step)
+            next_step += 1
+        if values.get("assessment"):
+            yield {"type": "assessment.ready", "data": {"assessment": values["assessment"]}}
+        if not snapshot.next:
+            yield {"type": "tutor.complete", "data": {"message": "Teaching session completed!"}}
+            return
+        
+        total_steps = self._total_steps(values)
+        config: RunnableConfig = {
+            "configurable": {"use_cache": True, "thread_id": session_id},
+            "recursion_limit": total_steps + 10
+        }
+        if parallel:
+            config["max_concurrency"] = self.max_parallel_steps
+        async for event in self._run_graph(graph, None, config, session_id, stream_tokens, next_step):
+            yield event
+    
+    async def discard_checkpoint(self, session_id: str) -> None:
+        if self.checkpointer is not None and hasattr(self.checkpointer, "adelete_thread"):
+            await self.checkpointer.adelete_thread(session_id)
+    
+    async def _run_graph(
+        self,
+        graph: Any,
+        graph_input: AgentState | None,
+        config: RunnableConfig,
+        session_id: str,
+        stream_tokens: bool,
+        next_step: int = 1
+    ):
+        if not stream_tokens:
+            try:
+                async for event in self._stream_graph(graph, graph_input, config, next_step):
+                    yield event
+            finally:
+                self._discard_step_questions(session_id)
+            return
+        
+        queue: asyncio.Queue = asyncio.Queue()
+        
+        async def on_delta(step_number: int, delta: str) -> None:
+            await queue.put({
+                "type": "tutor.step.delta",
+                "data": {"step_number": step_number, "delta": delta}
+            })
+        
+        config.setdefault("configurable", {})["on_delta"] = on_delta
+        
+        async def produce() -> None:
+            try:
+                async for event in self._stream_graph(graph, graph_input, config, next_step):
+                    await queue.put(event)
+            finally:
+                await queue.put(None)
+        
+        task = asyncio.create_task(produce())
+        try:
+            while True:
+                event = await queue.get()
+                if event is None:
+                    break
+                yield event
+            await task
+        finally:
+            task.cancel()
+            self._discard_step_questions(session_id)
+    
+    def _discard_step_questions(self, session_id: str) -> None:
+        for task in self._step_questions.pop(session_id, []):
+            task.cancel()
+    
+    def _step_event(self, step: dict) -> dict:
+        return {
+            "type": "tutor.step",
+            "data": {
+                "step_number": step["step_number"],
+                "title": step["title"],
+                "content": step["content"],
+                "is_complete": step.get("is_complete", True),
+                "summary": step.get("summary")
+            }
+        }
+    
+    async def _stream_graph(self, graph: Any, graph_input: AgentState | None, config: RunnableConfig, next_step: int = 1):
+        # Updates carry only the keys a node returned, so teach_step updates
+        # hold just the newly taught steps. Parallel branches finish in any
+        # order, so a step is held back until every step before it was sent.
+        held: dict[int, dict] = {}
+        
+        async for state_update in graph.astream(graph_input, config):
             for node_name, node_state in state_update.items():
+                if not node_state:
+                    continue
+                
                 if node_name == "teach_step":
-                    steps_completed = node_state.get("steps_completed", [])
-                    if len(steps_completed) > last_step_count:
-                        for step in steps_completed[last_step_count:]:
-                            yield {
-                                "type": "tutor.step",
-                                "data": {
-                                    "step_number": step["step_number"],
-                                    "title": step["title"],
-                                    "content": step["content"],
-                                    "is_complete": step.get("is_complete", True)
-                                }
-                            }
-                        last_step_count = len(steps_completed)
+                    for step in node_state.get("steps_completed", []):
+                        if step["step_number"] >= next_step:
+                            held[step["step_number"]] = step
+                    while next_step in held:
+                        yield self._step_event(held.pop(next_step))
+                        next_step += 1
                 
                 elif node_name == "generate_assessment":
                     assessment = node_state.get("assessment")
@@ -193,4 +516,3 @@ class TutorAgent:
                         "type": "tutor.complete",
                         "data": {"message": "Teaching session completed!"}
                     }
-
@@ -1,17 +1,32 @@
 import json
 import uuid
-import os
 import random
-from typing import List, Dict, Any, Optional
-from pydantic import SecretStr
-from langchain_openai import ChatOpenAI
+from typing import List, Dict, Any, Optional, Iterator
 from langchain_core.messages import SystemMessage, HumanMessage
 from dotenv import load_dotenv
 from app.models import Assessment, Question, QuestionType, AssessmentGenerationRequest
+from app.llm_gateway import get_default_gateway, _is_retryable
+from app.metrics import ASSESSMENT_SECONDS, ASSESSMENT_PARSE_SECONDS
+from app.context_budget import ContextBudget, create_context_budget
 
 load_dotenv()
 
 
+MAX_FOLLOWUP_ROUNDS = 2
+
+
+class AssessmentGenerationError(Exception):
+    pass
+
+VARIATION_HINTS = [
+    "Focus on different aspects and perspectives",
+    "Ask questions that test deeper understanding",
+    "Create questions that require application of concepts",
+    "Generate questions covering various subtopics",
+    "Focus on practical applications and examples"
+]
+
+
 def _ensure_string_content(content) -> str:
     if isinstance(content, list):
         return " ".join(str(item) for item in content)
@@ -20,25 +35,111 @@ def _ensure_string_content(content) -> str:
     return content
 
 
+def _iter_json_objects(content: str) -> Iterator[Any]:
+    """Yield the elements of a complete LLM reply's JSON array one at a time.
+
+    This is tolerant rather than streaming parsing: decoding stops at the
+    first truncated element instead of failing the whole array, and an element
+    that cannot be decoded is skipped by resyncing on the next object.
+    """
+    decoder = json.JSONDecoder()
+    pos = content.find("[")
+    if pos == -1:
+        pos = content.find("{")
+        if pos == -1:
+            return
+    else:
+        pos += 1
+    
+    length = len(content)
+    while pos < length:
+        while pos < length and content[pos] in " \t\r\n,":
+            pos += 1
+        if pos >= length or content[pos] == "]":
+            return
+        try:
+            item, pos = decoder.raw_decode(content, pos)
+        except json.JSONDecodeError:
+            next_pos = content.find("{", pos + 1)
+            if next_pos == -1:
+                return
+            pos = next_pos
+            continue
+        yield item
+
+
+def _question_key(text: str) -> str:
+    return " ".join(text.lower().split()).rstrip("?. ")
+
+
+def _validate_mcq(q_data: Any, question_id: str) -> Optional[Question]:
+    if not isinstance(q_data, dict):
+        return None
+    
+    question = q_data.get("question")
+    options = q_data.get("options")
+    answer = q_data.get("correct_answer")
+    if not isinstance(question, str) or not question.strip():
+        return None
+    if not isinstance(options, list) or len(options) != 4:
+        return None
+    if not all(isinstance(o, str) and o.strip() for o in options):
+        return None
+    if len({o.strip().lower() for o in options}) != 4:
+        return None
+    if not isinstance(answer, str):
+        return None
+    
+    if answer not in options:
+        letter = answer.strip().rstrip(".)").upper()
+        if letter in ("A", "B", "C", "D"):
+            answer = options["ABCD".index(letter)]
+        else:
+            matches = [o for o in options if o.strip().lower() == answer.strip().lower()]
+            if not matches:
+                return None
+            answer = matches[0]
+    
+    points = q_data.get("points", 10)
+    if not isinstance(points, int) or not 1 <= points <= 100:
+        points = 10
+    
+    return Question(
+        id=question_id,
+        type=QuestionType.MCQ,
+        question=question,
+        options=options,
+        expected_answer=answer,
+        points=points,
+        keywords=None
+    )
+
+
 class AssessmentGenerator:
-    def __init__(self):
-        api_key = os.getenv("OPENAI_API_KEY")
-        self.llm = ChatOpenAI(
-            model="gpt-4",
-            temperature=0.9,
-            api_key=SecretStr(api_key) if api_key else None
-        )
+    def __init__(self, llm: Any = None, context_budget: Optional[ContextBudget] = None):
+        if llm is None:
+            llm = get_default_gateway().chat_model("gpt-4", temperature=0.9)
+        self.llm = llm
+        self.context_budget = context_budget or create_context_budget()
     
-    def generate_assessment(self, request: AssessmentGenerationRequest) -> Assessment:
+    async def generate_assessment(self, request: AssessmentGenerationRequest) -> Assessment:
         teaching_content = self._prepare_teaching_content(request.topic, request.teaching_steps)
         
-        questions = self._generate_mcq_with_llm(
-            request.topic,
-            teaching_content,
-            1,
-            request.question_count,
-            request.difficulty
-        )
+        with ASSESSMENT_SECONDS.time("full"):
+            questions = await self._generate_mcq_with_llm(
+                request.topic,
+                teaching_content,
+                1,
+                request.question_count,
+                request.difficulty
+            )
+        
+        # Step questions may come up short and get merged; a full assessment
+        # is never stored with fewer questions than were asked for.
+        if len(questions) < request.question_count:
+            raise AssessmentGenerationError(
+                f"Only {len(questions)} of {request.question_count} questions could be generated for {request.topic}"
+            )
         
         return Assessment(
             id=str(uuid.uuid4()),
@@ -48,30 +149,101 @@ class AssessmentGenerator:
             pass_threshold=0.7
         )
     
+    async def generate_step_questions(
+        self, topic: str, step: Dict[str, Any], count: int, difficulty: str = "medium"
+    ) -> List[Question]:
+        teaching_content = self._prepare_teaching_content(topic, [step])
+        with ASSESSMENT_SECONDS.time("step"):
+            return await self._generate_mcq_with_llm(topic, teaching_content, 1, count, difficulty)
+    
+    def merge_step_questions(
+        self, topic: str, question_groups: List[List[Question]], question_count: int
+    ) -> Assessment:
+        # Round-robin across steps so every step is represented before any step
+        # contributes a second question; near-identical questions are dropped.
+        seen = set()
+        unique_groups = []
+        for group in question_groups:
+            unique = []
+            for question in group:
+                key = _question_key(question.question)
+                if key not in seen:
+                    seen.add(key)
+                    unique.append(question)
+            unique_groups.append(unique)
+        
+        questions: List[Question] = []
+        depth = 0
+        while len(questions) < question_count and any(depth < len(g) for g in unique_groups):
+            for group in unique_groups:
+                if depth < len(group) and len(questions) < question_count:
+                    questions.append(group[depth].model_copy(update={"id": f"q_{len(questions) + 1}"}))
+            depth += 1
+        
+        return Assessment(
+            id=str(uuid.uuid4()),
+            topic=topic,
+            questions=questions,
+            total_points=sum(q.points for q in questions),
+            pass_threshold=0.7
+        )
+    
     def _prepare_teaching_content(self, topic: str, teaching_steps: Optional[List[Dict[str, Any]]]) -> str:
         if not teaching_steps:
             return f"Topic: {topic}"
         
-        content_parts = [f"Topic: {topic}\n\nTeaching Content:\n"]
-        for step in teaching_steps:
-            step_num = step.get("step_number", 0)
-            title = step.get("title", "")
-            content = step.get("content", "")
-            content_parts.append(f"Step {step_num}: {title}\n{content}\n")
-        
-        return "\n".join(content_parts)
+        return self.context_budget.render(topic, teaching_steps)
     
-    def _generate_mcq_with_llm(
+    async def _generate_mcq_with_llm(
         self, topic: str, teaching_content: str, start_id: int, count: int, difficulty: str
     ) -> List[Question]:
-        variation_hints = [
-            "Focus on different aspects and perspectives",
-            "Ask questions that test deeper understanding",
-            "Create questions that require application of concepts",
-            "Generate questions covering various subtopics",
-            "Focus on practical applications and examples"
-        ]
-        variation = random.choice(variation_hints)
+        # Each question is validated on its own; only the missing ones are
+        # requested again, and a bad item never discards the rest of the batch.
+        # If rounds run out, the valid questions are returned even if fewer
+        # than count, rather than padded with filler.
+        variation = random.choice(VARIATION_HINTS)
+        questions: List[Question] = []
+        seen = set()
+        
+        for _ in range(1 + MAX_FOLLOWUP_ROUNDS):
+            missing = count - len(questions)
+            if missing <= 0:
+                break
+            
+            avoid = [q.question for q in questions]
+            try:
+                content = await self._request_mcq_json(teaching_content, missing, difficulty, variation, avoid)
+            except Exception as e:
+                # Rate limits and timeouts left over after the gateway's own
+                # retries get another round; auth and config errors do not.
+                if not _is_retryable(e):
+                    raise
+                continue
+            
+            with ASSESSMENT_PARSE_SECONDS.time():
+                for q_data in _iter_json_objects(content):
+                    question = _validate_mcq(q_data, f"q_{start_id + len(questions)}")
+                    if question is None:
+                        continue
+                    key = _question_key(question.question)
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    questions.append(question)
+                    if len(questions) == count:
+                        break
+        
+        if not questions:
+            raise AssessmentGenerationError(f"Could not generate valid questions for {topic}")
+        
+        return questions
+    
+    async def _request_mcq_json(
+        self, teaching_content: str, count: int, difficulty: str, variation: str, avoid: List[str]
+    ) -> str:
+        avoid_text = ""
+        if avoid:
+            avoid_text = "\n\nDo NOT repeat any of these existing questions:\n" + "\n".join(f"- {q}" for q in avoid)
         
         prompt = f"""Generate {count} multiple choice question(s) based on the following teaching content at {difficulty} difficulty level.
 
@@ -102,14 +274,14 @@ Return as JSON array with this structure:
   }}
 ]
 
-Make questions relevant to what was actually taught and appropriate for {difficulty} level. Generate NEW, DIFFERENT questions that haven't been asked before."""
+Make questions relevant to what was actually taught and appropriate for {difficulty} level. Generate NEW, DIFFERENT questions that haven't been asked before.{avoid_text}"""
 
         messages = [
             SystemMessage(content="You are an expert educator creating assessment questions. Always return valid JSON."),
             HumanMessage(content=prompt)
         ]
         
-        response = self.llm.invoke(messages)
+        response = await self.llm.ainvoke(messages)
         content = _ensure_string_content(response.content).strip()
         
         if "```json" in content:
@@ -117,62 +289,4 @@ Make questions relevant to what was actually taught and appropriate for {difficu
         elif "```" in content:
             content = content.split("```")[1].split("```")[0].strip()
         
-        try:
-            questions_data = json.loads(content)
-            questions = []
-            for idx, q_data in enumerate(questions_data):
-                questions.append(Question(
-                    id=f"q_{start_id + idx}",
-                    type=QuestionType.MCQ,
-                    question=q_data["question"],
-                    options=q_data["options"],
-                    expected_answer=q_data["correct_answer"],
-                    points=q_data.get("points", 10),
-                    keywords=None
-                ))
-            return questions
-        except json.JSONDecodeError:
-            return [self._create_fallback_mcq(topic, teaching_content, start_id)]
-    
-    def _create_fallback_mcq(self, topic: str, teaching_content: str, q_id: int) -> Question:
-        try:
-            prompt = f"""Generate ONE multiple choice question based on this teaching content. Return JSON:
-{teaching_content}
-
-{{
-  "question": "Question based on teaching content",
-  "options": ["A", "B", "C", "D"],
-  "correct_answer": "A",
-  "points": 10
-}}"""
-            messages = [
-                SystemMessage(content="Return valid JSON only."),
-                HumanMessage(content=prompt)
-            ]
-            response = self.llm.invoke(messages)
-            content = _ensure_string_content(response.content).strip()
-            if "```json" in content:
-                content = content.split("```json")[1].split("```")[0].strip()
-            elif "```" in content:
-                content = content.split("```")[1].split("```")[0].strip()
-            q_data = json.loads(content)
-            return Question(
-                id=f"q_{q_id}",
-                type=QuestionType.MCQ,
-                question=q_data["question"],
-                options=q_data["options"],
-                expected_answer=q_data["correct_answer"],
-                points=q_data.get("points", 10),
-                keywords=None
-            )
-        except Exception:
-            return Question(
-                id=f"q_{q_id}",
-                type=QuestionType.MCQ,
-                question=f"What is an important aspect of {topic}?",
-                options=["A relevant concept", "An unrelated concept", "Another unrelated concept", "Yet another unrelated concept"],
-                expected_answer="A relevant concept",
-                points=10,
-                keywords=None
-            )
-
+        return content
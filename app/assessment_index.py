@@ -0,0 +1,85 @@
+from typing import Any, Dict, List, Optional
+
+from app.store import Store
+from app.step_cache import normalize_topic
+
+
+class AssessmentIndex:
+    """Reverse lookups from assessments to the session that taught them.
+
+    Links live in their own stores so they are shared the same way as the data
+    they point to. Entries whose target has been evicted are dropped on read,
+    and eviction hooks on the session/assessment stores drop them eagerly.
+    """
+
+    def __init__(
+        self,
+        sessions: Store,
+        assessments: Store,
+        links: Store,
+        topics: Store,
+        max_per_topic: int = 50
+    ):
+        self.sessions = sessions
+        self.assessments = assessments
+        self.links = links
+        self.topics = topics
+        self.max_per_topic = max_per_topic
+        sessions.on_evict = self._on_session_evicted
+        assessments.on_evict = self._on_assessment_evicted
+
+    def link(self, assessment_id: str, session_id: Optional[str], topic: str) -> None:
+        self.links.set(assessment_id, {"session_id": session_id, "topic": topic})
+
+        key = normalize_topic(topic)
+        entry = self.topics.get(key) or {"assessment_ids": []}
+        ids = [i for i in entry["assessment_ids"] if i != assessment_id]
+        ids.append(assessment_id)
+        self.topics.set(key, {"assessment_ids": ids[-self.max_per_topic:]})
+
+        if session_id is not None:
+            session = self.sessions.get(session_id)
+            if session is not None and assessment_id not in session.setdefault("assessments", []):
+                session["assessments"].append(assessment_id)
+                self.sessions.set(session_id, session)
+
+    def session_id_for(self, assessment_id: str) -> Optional[str]:
+        link = self.links.get(assessment_id)
+        return link.get("session_id") if link else None
+
+    def teaching_steps_for(self, assessment_id: str) -> Optional[List[Dict[str, Any]]]:
+        session_id = self.session_id_for(assessment_id)
+        if session_id is None:
+            return None
+        session = self.sessions.get(session_id)
+        if session is None:
+            self.links.set(assessment_id, {**(self.links.get(assessment_id) or {}), "session_id": None})
+            return None
+        return session.get("steps_completed", [])
+
+    def assessments_for_topic(self, topic: str) -> List[str]:
+        entry = self.topics.get(normalize_topic(topic))
+        return list(entry["assessment_ids"]) if entry else []
+
+    def _on_session_evicted(self, session_id: str, session: Dict[str, Any]) -> None:
+        for assessment_id in session.get("assessments", []):
+            link = self.links.get(assessment_id)
+            if link is not None and link.get("session_id") == session_id:
+                self.links.set(assessment_id, {**link, "session_id": None})
+
+    def _on_assessment_evicted(self, assessment_id: str, assessment: Dict[str, Any]) -> None:
+        link = self.links.get(assessment_id)
+        self.links.delete(assessment_id)
+
+        topic = (link or {}).get("topic") or assessment.get("topic")
+        if not topic:
+            return
+        key = normalize_topic(topic)
+        entry = self.topics.get(key)
+        if entry is None:
+            return
+        ids = [i for i in entry["assessment_ids"] if i != assessment_id]
+        if ids:
+            self.topics.set(key, {"assessment_ids": ids})
+        else:
+            self.topics.delete(key)
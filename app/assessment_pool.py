@@ -0,0 +1,116 @@
+import asyncio
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from app.models import Assessment, AssessmentGenerationRequest, Difficulty
+from app.assessment_generator import AssessmentGenerator
+from app.step_cache import normalize_topic
+
+
+class _TopicPool:
+    def __init__(self, topic: str, difficulty: Difficulty, teaching_steps: Optional[List[Dict[str, Any]]]):
+        self.topic = topic
+        self.difficulty: Difficulty = difficulty
+        self.teaching_steps = teaching_steps
+        self.ready: Deque[Assessment] = deque()
+        self.refill_task: Optional[asyncio.Task] = None
+
+
+class AssessmentPool:
+    """Per-topic (and difficulty) queue of pre-generated assessments so retakes never wait on the LLM."""
+
+    def __init__(
+        self,
+        generator: AssessmentGenerator,
+        target_depth: int = 2,
+        max_topics: int = 200,
+        max_concurrent_refills: int = 4,
+        question_count: int = 5
+    ):
+        self.generator = generator
+        self.target_depth = target_depth
+        self.max_topics = max_topics
+        self.question_count = question_count
+        self._topics: "OrderedDict[Tuple[str, str], _TopicPool]" = OrderedDict()
+        self._refill_slots = asyncio.Semaphore(max_concurrent_refills)
+        self.hits = 0
+        self.misses = 0
+        self.refill_errors = 0
+
+    def register(
+        self,
+        topic: str,
+        teaching_steps: Optional[List[Dict[str, Any]]],
+        difficulty: Difficulty = "medium"
+    ) -> None:
+        key = (normalize_topic(topic), difficulty)
+        pool = self._topics.get(key)
+        if pool is None:
+            pool = _TopicPool(topic, difficulty, teaching_steps)
+            self._topics[key] = pool
+            self._evict()
+        elif teaching_steps:
+            pool.teaching_steps = teaching_steps
+        self._topics.move_to_end(key)
+        self._schedule_refill(key)
+
+    def pop(self, topic: str, difficulty: Difficulty = "medium") -> Optional[Assessment]:
+        key = (normalize_topic(topic), difficulty)
+        pool = self._topics.get(key)
+        if pool is None or not pool.ready:
+            self.misses += 1
+            if pool is not None:
+                self._schedule_refill(key)
+            return None
+
+        self.hits += 1
+        self._topics.move_to_end(key)
+        assessment = pool.ready.popleft()
+        self._schedule_refill(key)
+        return assessment
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "topics": len(self._topics),
+            "pooled_assessments": sum(len(p.ready) for p in self._topics.values()),
+            "depth_by_topic": {
+                f"{topic}:{difficulty}": len(p.ready) for (topic, difficulty), p in self._topics.items()
+            },
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            "refill_errors": self.refill_errors
+        }
+
+    def _evict(self) -> None:
+        while len(self._topics) > self.max_topics:
+            _, pool = self._topics.popitem(last=False)
+            if pool.refill_task is not None:
+                pool.refill_task.cancel()
+
+    def _schedule_refill(self, key: Tuple[str, str]) -> None:
+        pool = self._topics[key]
+        if len(pool.ready) >= self.target_depth:
+            return
+        if pool.refill_task is not None and not pool.refill_task.done():
+            return
+        pool.refill_task = asyncio.create_task(self._refill(pool))
+
+    async def _refill(self, pool: _TopicPool) -> None:
+        while len(pool.ready) < self.target_depth:
+            request = AssessmentGenerationRequest(
+                topic=pool.topic,
+                question_count=self.question_count,
+                difficulty=pool.difficulty,
+                teaching_steps=pool.teaching_steps
+            )
+            try:
+                async with self._refill_slots:
+                    assessment = await self.generator.generate_assessment(request)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.refill_errors += 1
+                return
+            pool.ready.append(assessment)
@@ -0,0 +1,166 @@
+import os
+import json
+import sqlite3
+import threading
+from array import array
+from typing import Any, Dict, List, Optional
+
+from app.models import GradeReport
+from app.step_cache import normalize_topic
+
+
+class AttemptLog:
+    """Append-only log of graded attempts, one row per submission.
+
+    Per-question results are stored column-wise as packed arrays (scores as
+    float64, correctness as bytes) with the question id order kept once per
+    assessment, so a row stays small regardless of how it is queried.
+    Aggregates run in SQL or stream over a cursor and never load the whole log.
+    """
+
+    def __init__(self, path: str = ":memory:"):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS attempts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                student_id TEXT NOT NULL,
+                assessment_id TEXT NOT NULL,
+                topic TEXT NOT NULL,
+                total_score REAL NOT NULL,
+                max_score REAL NOT NULL,
+                passed INTEGER NOT NULL,
+                submitted_at TEXT NOT NULL,
+                scores BLOB NOT NULL,
+                correct BLOB NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS attempts_student ON attempts(student_id, assessment_id);
+            CREATE INDEX IF NOT EXISTS attempts_assessment ON attempts(assessment_id);
+            CREATE INDEX IF NOT EXISTS attempts_topic ON attempts(topic, passed);
+            CREATE TABLE IF NOT EXISTS assessment_questions (
+                assessment_id TEXT PRIMARY KEY,
+                question_ids TEXT NOT NULL
+            );
+            """
+        )
+
+    def record(self, student_id: str, topic: str, report: GradeReport, submitted_at: str) -> int:
+        question_ids = [g.question_id for g in report.question_grades]
+        scores = array("d", (g.score for g in report.question_grades))
+        correct = bytes(1 if g.is_correct else 0 for g in report.question_grades)
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO assessment_questions (assessment_id, question_ids) VALUES (?, ?)",
+                (report.assessment_id, json.dumps(question_ids))
+            )
+            cursor = self._conn.execute(
+                "INSERT INTO attempts (student_id, assessment_id, topic, total_score, max_score, "
+                "passed, submitted_at, scores, correct) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    student_id,
+                    report.assessment_id,
+                    normalize_topic(topic),
+                    report.total_score,
+                    report.max_score,
+                    int(report.passed),
+                    submitted_at,
+                    scores.tobytes(),
+                    correct
+                )
+            )
+            return cursor.lastrowid or 0
+
+    def attempts(self, assessment_id: str, student_id: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        query = (
+            "SELECT id, student_id, total_score, max_score, passed, submitted_at "
+            "FROM attempts WHERE assessment_id = ?"
+        )
+        params: List[Any] = [assessment_id]
+        if student_id is not None:
+            query += " AND student_id = ?"
+            params.append(student_id)
+        query += " ORDER BY id LIMIT ?"
+        params.append(limit)
+
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [self._summary(row) for row in rows]
+
+    def best_attempt(self, assessment_id: str, student_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, student_id, total_score, max_score, passed, submitted_at FROM attempts "
+                "WHERE student_id = ? AND assessment_id = ? ORDER BY total_score DESC, id LIMIT 1",
+                (student_id, assessment_id)
+            ).fetchone()
+        return self._summary(row) if row else None
+
+    def question_stats(self, assessment_id: str) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT question_ids FROM assessment_questions WHERE assessment_id = ?", (assessment_id,)
+            ).fetchone()
+            if row is None:
+                return {}
+            question_ids = json.loads(row[0])
+            count = len(question_ids)
+            cursor = self._conn.execute(
+                "SELECT scores, correct FROM attempts WHERE assessment_id = ?", (assessment_id,)
+            )
+            correct_counts = [0] * count
+            score_sums = [0.0] * count
+            attempts = 0
+            while True:
+                chunk = cursor.fetchmany(1000)
+                if not chunk:
+                    break
+                for scores_blob, correct in chunk:
+                    attempts += 1
+                    scores = array("d")
+                    scores.frombytes(scores_blob)
+                    for index in range(min(count, len(correct))):
+                        correct_counts[index] += correct[index]
+                        score_sums[index] += scores[index]
+
+        if attempts == 0:
+            return {}
+        return {
+            qid: {
+                "miss_rate": 1.0 - correct_counts[i] / attempts,
+                "mean_score": score_sums[i] / attempts
+            }
+            for i, qid in enumerate(question_ids)
+        }
+
+    def pass_rate(self, topic: str) -> Dict[str, Any]:
+        with self._lock:
+            attempts, passed = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(passed), 0) FROM attempts WHERE topic = ?",
+                (normalize_topic(topic),)
+            ).fetchone()
+        return {
+            "topic": topic,
+            "attempts": attempts,
+            "passed": passed,
+            "pass_rate": (passed / attempts) if attempts else 0.0
+        }
+
+    def _summary(self, row: tuple) -> Dict[str, Any]:
+        attempt_id, student_id, total_score, max_score, passed, submitted_at = row
+        return {
+            "attempt_id": attempt_id,
+            "student_id": student_id,
+            "total_score": total_score,
+            "max_score": max_score,
+            "percentage": (total_score / max_score) if max_score > 0 else 0.0,
+            "passed": bool(passed),
+            "submitted_at": submitted_at
+        }
+
+
+def create_attempt_log() -> AttemptLog:
+    return AttemptLog(os.getenv("ATTEMPT_LOG_PATH", "attempts.db"))
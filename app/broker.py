@@ -0,0 +1,84 @@
+import os
+import json
+import asyncio
+from typing import Any, AsyncIterator, Dict, Set
+
+
+class Broker:
+    """Pub/sub channel used to reach WebSockets held by other workers.
+
+    Messages are JSON-compatible dicts. subscribe() yields every message
+    published to the channel after it starts, until the iterator is closed.
+    """
+
+    async def publish(self, channel: str, message: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def subscribe(self, channel: str) -> AsyncIterator[Dict[str, Any]]:
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+
+class InProcessBroker(Broker):
+    """Broker for a single worker, and an in-process fake for multi-worker setups.
+
+    Routers sharing one instance behave like workers sharing a Redis server.
+    Messages go through JSON so anything that would not survive Redis fails here too.
+    """
+
+    def __init__(self):
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+
+    async def publish(self, channel: str, message: Dict[str, Any]) -> None:
+        payload = json.dumps(message)
+        for queue in self._subscribers.get(channel, ()):
+            queue.put_nowait(payload)
+
+    async def subscribe(self, channel: str) -> AsyncIterator[Dict[str, Any]]:
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.setdefault(channel, set()).add(queue)
+        try:
+            while True:
+                yield json.loads(await queue.get())
+        finally:
+            subscribers = self._subscribers.get(channel)
+            if subscribers is not None:
+                subscribers.discard(queue)
+                if not subscribers:
+                    del self._subscribers[channel]
+
+
+class RedisBroker(Broker):
+    """Broker on Redis pub/sub; client is a redis.asyncio.Redis."""
+
+    def __init__(self, client: Any, prefix: str = "tutor:broker:"):
+        self.client = client
+        self.prefix = prefix
+
+    async def publish(self, channel: str, message: Dict[str, Any]) -> None:
+        await self.client.publish(self.prefix + channel, json.dumps(message))
+
+    async def subscribe(self, channel: str) -> AsyncIterator[Dict[str, Any]]:
+        pubsub = self.client.pubsub()
+        await pubsub.subscribe(self.prefix + channel)
+        try:
+            async for item in pubsub.listen():
+                if item.get("type") == "message":
+                    yield json.loads(item["data"])
+        finally:
+            await pubsub.unsubscribe(self.prefix + channel)
+            await pubsub.aclose()
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+def create_broker() -> Broker:
+    backend = os.getenv("BROKER_BACKEND", "memory").lower()
+
+    if backend == "redis":
+        import redis.asyncio
+        return RedisBroker(redis.asyncio.Redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379/0")))
+    return InProcessBroker()
@@ -0,0 +1,23 @@
+import os
+from typing import Any, Optional
+
+from langgraph.checkpoint.memory import MemorySaver
+
+
+def create_checkpointer() -> Optional[Any]:
+    backend = os.getenv("CHECKPOINT_BACKEND", "memory").lower()
+
+    if backend == "none":
+        return None
+    if backend == "sqlite":
+        try:
+            import aiosqlite
+            from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+        except ImportError as e:
+            raise RuntimeError(
+                "CHECKPOINT_BACKEND=sqlite needs the aiosqlite and langgraph-checkpoint-sqlite "
+                "packages; install them with pip install -r requirements.txt"
+            ) from e
+        # Must be called with the event loop running: the saver binds to it.
+        return AsyncSqliteSaver(aiosqlite.connect(os.getenv("CHECKPOINT_PATH", "checkpoints.db")))
+    return MemorySaver()
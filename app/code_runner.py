@@ -0,0 +1,500 @@
+import os
+import ast
+import sys
+import json
+import select
+import hashlib
+import tempfile
+import threading
+import subprocess
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+# Stands in for the expected value of an assert test case that could not be
+# split into an expression and a literal; the child's own verdict is used.
+_CHILD_VERDICT = object()
+
+# Runs inside each warm worker process. The worker stays alive between jobs and
+# forks a short-lived child per submission, so every run gets a clean
+# interpreter state and its own resource limits without paying interpreter
+# startup. Requests and responses are one JSON object per line.
+#
+# Before running a submission the child isolates itself (Linux only): new
+# network and mount namespaces (plus a user namespace when the server is not
+# root), every mount remounted read-only except a throwaway working
+# directory, the server's directories and /proc hidden under empty tmpfs
+# mounts, then all privileges dropped (to CODE_RUNNER_USER when root). If any
+# step fails the submission is not run.
+#
+# The worker never sees expected results. Each test case comes back as the
+# JSON encoding of the value the submission produced, and CodeRunner compares
+# the decoded plain data in the server, so an object with a rigged __eq__ or
+# a child that writes its own verdict has nothing to compare against.
+WORKER_SOURCE = r'''
+import os, sys, json, select, signal, shutil, tempfile
+
+# Imported up front: once a job has dropped privileges it may no longer be
+# able to read the standard library.
+try:
+    import ctypes
+    import resource
+except ImportError:
+    ctypes = resource = None
+
+SETTINGS = json.loads(sys.argv[1])
+
+CLONE_NEWNS = 0x00020000
+CLONE_NEWUSER = 0x10000000
+CLONE_NEWNET = 0x40000000
+MS_RDONLY, MS_NOSUID, MS_NODEV, MS_NOEXEC = 1, 2, 4, 8
+MS_REMOUNT, MS_BIND, MS_REC = 32, 4096, 16384
+MS_PRIVATE = 1 << 18
+MOUNT_OPTIONS = {
+    "nosuid": MS_NOSUID, "nodev": MS_NODEV, "noexec": MS_NOEXEC,
+    "noatime": 1024, "nodiratime": 2048, "relatime": 1 << 21
+}
+# Kernel filesystems that may refuse a read-only remount; they are either
+# not writable by an unprivileged user or hidden below.
+PSEUDO_FILESYSTEMS = {
+    "proc", "sysfs", "cgroup", "cgroup2", "devpts", "mqueue", "debugfs", "tracefs",
+    "securityfs", "pstore", "bpf", "configfs", "fusectl", "binfmt_misc", "autofs", "hugetlbfs"
+}
+PR_SET_NO_NEW_PRIVS = 38
+
+class IsolationError(Exception):
+    pass
+
+def _check(result, what):
+    if result != 0:
+        raise IsolationError("%s: %s" % (what, os.strerror(ctypes.get_errno())))
+
+def _mounts():
+    mounts = []
+    with open("/proc/self/mountinfo") as f:
+        for line in f:
+            fields = line.split()
+            separator = fields.index("-")
+            point = fields[4].encode().decode("unicode_escape")
+            mounts.append((point, fields[5].split(","), fields[separator + 1]))
+    return mounts
+
+def _write(path, text):
+    with open(path, "w") as f:
+        f.write(text)
+
+def isolate(workdir):
+    if ctypes is None:
+        raise IsolationError("ctypes is not available")
+    libc = ctypes.CDLL(None, use_errno=True)
+    libc.mount.argtypes = [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_char_p, ctypes.c_ulong, ctypes.c_char_p]
+    uid, gid = os.getuid(), os.getgid()
+    root = uid == 0
+
+    flags = CLONE_NEWNS | CLONE_NEWNET | (0 if root else CLONE_NEWUSER)
+    _check(libc.unshare(flags), "unshare")
+    if not root:
+        _write("/proc/self/setgroups", "deny")
+        _write("/proc/self/uid_map", "%d %d 1" % (uid, uid))
+        _write("/proc/self/gid_map", "%d %d 1" % (gid, gid))
+
+    _check(libc.mount(None, b"/", None, MS_REC | MS_PRIVATE, None), "make mounts private")
+    _check(libc.mount(workdir.encode(), workdir.encode(), None, MS_BIND, None), "bind working directory")
+    for point, options, fstype in _mounts():
+        if point == workdir:
+            continue
+        remount = MS_REMOUNT | MS_BIND | MS_RDONLY
+        for option in options:
+            remount |= MOUNT_OPTIONS.get(option, 0)
+        if libc.mount(None, point.encode(), None, remount, None) != 0 and fstype not in PSEUDO_FILESYSTEMS:
+            _check(-1, "remount %s read-only" % point)
+    for path in SETTINGS["hidden_paths"]:
+        if os.path.isdir(path):
+            _check(
+                libc.mount(b"tmpfs", path.encode(), b"tmpfs", MS_RDONLY | MS_NOSUID | MS_NODEV | MS_NOEXEC, b"size=4k,mode=555"),
+                "hide %s" % path
+            )
+
+    os.chdir(workdir)
+    if root:
+        if SETTINGS["uid"] == 0:
+            raise IsolationError("refusing to run submissions as root")
+        os.setgroups([])
+        os.setgid(SETTINGS["gid"])
+        os.setuid(SETTINGS["uid"])
+    else:
+        # The user namespace gave this process every capability inside it;
+        # clear them so the submission cannot undo the mounts above.
+        header = (ctypes.c_uint32 * 2)(0x20080522, 0)
+        data = (ctypes.c_uint32 * 6)()
+        _check(libc.capset(header, data), "drop capabilities")
+    _check(libc.prctl(PR_SET_NO_NEW_PRIVS, 1, 0, 0, 0), "set no_new_privs")
+
+def run_tests(job):
+    ns = {"__name__": "__submission__"}
+    try:
+        exec(compile(job["code"], "<submission>", "exec"), ns)
+    except BaseException as e:
+        return {"error": "%s: %s" % (type(e).__name__, e), "results": []}
+    results = []
+    for case in job["test_cases"]:
+        try:
+            if "assert" in case:
+                results.append({"passed": bool(eval(case["assert"], ns))})
+                continue
+            if "function" in case:
+                args = case.get("args", case.get("input", []))
+                if not isinstance(args, list):
+                    args = [args]
+                value = ns[case["function"]](*args, **case.get("kwargs", {}))
+            else:
+                value = eval(case.get("call") or case["expression"], ns)
+            results.append({"value": json.dumps(value)})
+        except BaseException as e:
+            results.append({"passed": False, "error": "%s: %s" % (type(e).__name__, e)})
+    return {"error": None, "results": results}
+
+def limit_resources(job):
+    if resource is None:
+        return
+    try:
+        cpu = int(job["cpu_seconds"])
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu + 1))
+        memory = int(job["memory_mb"]) * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+        resource.setrlimit(resource.RLIMIT_NPROC, (0, 0))
+        files = int(job["file_mb"]) * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_FSIZE, (files, files))
+    except (ValueError, OSError):
+        pass
+
+def run_forked(job):
+    workdir = os.path.realpath(tempfile.mkdtemp(prefix="tutor-job-"))
+    if os.getuid() == 0:
+        os.chown(workdir, SETTINGS["uid"], SETTINGS["gid"])
+    try:
+        return _run_forked(job, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def _run_forked(job, workdir):
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        devnull = os.open(os.devnull, os.O_RDWR)
+        for fd in (0, 1, 2):
+            os.dup2(devnull, fd)
+        try:
+            if SETTINGS["isolation"]:
+                isolate(workdir)
+            else:
+                os.chdir(workdir)
+        except BaseException as e:
+            payload = json.dumps({"error": "Sandbox unavailable: %s" % e, "results": [], "ran": False})
+        else:
+            limit_resources(job)
+            try:
+                payload = json.dumps(run_tests(job))
+            except BaseException as e:
+                payload = json.dumps({"error": "%s: %s" % (type(e).__name__, e), "results": []})
+        with os.fdopen(write_fd, "w") as out:
+            out.write(payload)
+        os._exit(0)
+
+    os.close(write_fd)
+    chunks = []
+    timed_out = False
+    remaining = float(job["timeout"])
+    while True:
+        start = _now()
+        ready, _, _ = select.select([read_fd], [], [], max(remaining, 0))
+        if not ready:
+            timed_out = True
+            break
+        chunk = os.read(read_fd, 65536)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        remaining -= _now() - start
+    os.close(read_fd)
+    if timed_out:
+        try:
+            os.kill(pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+    _, status = os.waitpid(pid, 0)
+    if timed_out:
+        return {"error": "Time limit exceeded", "results": []}
+    if not chunks:
+        if os.WIFSIGNALED(status) and os.WTERMSIG(status) in (signal.SIGXCPU, signal.SIGKILL):
+            return {"error": "CPU time limit exceeded", "results": []}
+        return {"error": "Submission crashed or exceeded the memory limit", "results": []}
+    return json.loads(b"".join(chunks).decode("utf-8"))
+
+def _now():
+    import time
+    return time.monotonic()
+
+stdout = sys.stdout
+for line in sys.stdin:
+    job = json.loads(line)
+    if hasattr(os, "fork"):
+        result = run_forked(job)
+    elif SETTINGS["isolation"]:
+        result = {"error": "Sandbox unavailable: isolation needs Linux", "results": [], "ran": False}
+    else:
+        result = run_tests(job)
+    stdout.write(json.dumps(result) + "\n")
+    stdout.flush()
+'''
+
+
+def _minimal_env() -> Dict[str, str]:
+    # Workers must not inherit the server's environment (API keys, Redis URLs).
+    return {"PATH": os.defpath, "LANG": "C.UTF-8"}
+
+
+def _hidden_paths() -> List[str]:
+    # The server's working directory (.env, SQLite stores) and the app source
+    # are covered with an empty tmpfs inside the job's mount namespace, unless
+    # that would also hide the Python installation or the job directory.
+    needed = [os.path.realpath(p) for p in (sys.prefix, sys.base_prefix, tempfile.gettempdir())]
+    candidates = [os.getcwd(), os.path.dirname(os.path.dirname(os.path.abspath(__file__)))]
+    hidden = []
+    for path in (os.path.realpath(p) for p in candidates):
+        if path == "/" or path in hidden:
+            continue
+        if any(n == path or n.startswith(path + os.sep) for n in needed):
+            continue
+        hidden.append(path)
+    return hidden + ["/proc"]
+
+
+def _split_test_case(case: Dict[str, Any]) -> Tuple[Dict[str, Any], Any]:
+    # "assert f(2) == 4" is sent as the expression "f(2)" with 4 kept here.
+    if "assert" not in case:
+        return {k: v for k, v in case.items() if k != "expected"}, _plain(case.get("expected"))
+    try:
+        tree = ast.parse(case["assert"], mode="eval").body
+    except (SyntaxError, ValueError, TypeError):
+        return case, _CHILD_VERDICT
+    if isinstance(tree, ast.Compare) and len(tree.ops) == 1 and isinstance(tree.ops[0], ast.Eq):
+        for expression, literal in ((tree.left, tree.comparators[0]), (tree.comparators[0], tree.left)):
+            try:
+                expected = ast.literal_eval(literal)
+            except ValueError:
+                continue
+            return {"expression": ast.unparse(expression)}, _plain(expected)
+    return case, _CHILD_VERDICT
+
+
+def _plain(value: Any) -> Any:
+    # Expected values go through the same JSON round trip as the submission's,
+    # so tuples become lists on both sides.
+    try:
+        return json.loads(json.dumps(value))
+    except (TypeError, ValueError):
+        return value
+
+
+def _same(value: Any, expected: Any) -> bool:
+    # Both sides are plain JSON data by now, so == runs no submission code.
+    # Types must match as well: True is not 1 and "1" is not 1.
+    if isinstance(value, bool) or isinstance(expected, bool):
+        return type(value) is type(expected) and value == expected
+    if isinstance(value, (int, float)) and isinstance(expected, (int, float)):
+        return value == expected
+    if type(value) is not type(expected):
+        return False
+    if isinstance(value, list):
+        return len(value) == len(expected) and all(_same(v, e) for v, e in zip(value, expected))
+    if isinstance(value, dict):
+        return value.keys() == expected.keys() and all(_same(value[k], expected[k]) for k in value)
+    return value == expected
+
+
+class _Worker:
+    def __init__(self, settings: Dict[str, Any], python: str):
+        self.process = subprocess.Popen(
+            [python, "-I", "-c", WORKER_SOURCE, json.dumps(settings)],
+            env=_minimal_env(),
+            cwd=tempfile.gettempdir(),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            bufsize=1
+        )
+
+    def run(self, job: Dict[str, Any], timeout: float) -> Optional[Dict[str, Any]]:
+        assert self.process.stdin is not None and self.process.stdout is not None
+        self.process.stdin.write(json.dumps(job) + "\n")
+        self.process.stdin.flush()
+        ready, _, _ = select.select([self.process.stdout], [], [], timeout)
+        if not ready:
+            raise TimeoutError
+        line = self.process.stdout.readline()
+        return json.loads(line) if line else None
+
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def close(self) -> None:
+        if self.alive():
+            self.process.kill()
+        self.process.wait()
+
+
+class CodeRunner:
+    """Runs coding submissions against their test cases in warm worker processes.
+
+    Each worker forks a child per submission with CPU, memory, file size and
+    wall-clock limits, isolated as described above WORKER_SOURCE unless
+    isolation is False. Results are cached by a hash of code, test cases and
+    limits, so a class submitting the same solution only runs it once; runs
+    that failed for reasons other than the submission (sandbox unavailable,
+    a worker lost) are not cached.
+
+    python is the interpreter the workers run; it must be readable by user.
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        timeout: float = 5.0,
+        cpu_seconds: int = 5,
+        memory_mb: int = 256,
+        cache_size: int = 4096,
+        file_mb: int = 16,
+        isolation: bool = True,
+        user: str = "nobody",
+        python: Optional[str] = None
+    ):
+        self.workers = workers or os.cpu_count() or 2
+        self.timeout = timeout
+        self.cpu_seconds = cpu_seconds
+        self.memory_mb = memory_mb
+        self.file_mb = file_mb
+        self.cache_size = cache_size
+        self.isolation = isolation
+        self.user = user
+        self.python = python or sys.executable
+        self._idle: List[_Worker] = []
+        self._started = 0
+        self._lock = threading.Lock()
+        # Signalled whenever a worker is returned or a worker slot frees up.
+        self._available = threading.Condition(self._lock)
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def run(self, code: str, test_cases: List[Dict[str, Any]]) -> Dict[str, Any]:
+        job = {
+            "code": code,
+            "test_cases": test_cases,
+            "timeout": self.timeout,
+            "cpu_seconds": self.cpu_seconds,
+            "memory_mb": self.memory_mb,
+            "file_mb": self.file_mb
+        }
+        cache_key = hashlib.sha256(json.dumps(job, sort_keys=True, default=repr).encode("utf-8")).hexdigest()
+        with self._lock:
+            cached = self._cache.get(cache_key)
+            if cached is not None:
+                self._cache.move_to_end(cache_key)
+                return cached
+
+        split = [_split_test_case(case) for case in test_cases]
+        raw = self._execute({**job, "test_cases": [call for call, _ in split]})
+        result = self._summarize(raw, [expected for _, expected in split])
+
+        if raw.get("ran", True):
+            with self._lock:
+                self._cache[cache_key] = result
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return result
+
+    def run_many(self, jobs: List[Tuple[str, List[Dict[str, Any]]]]) -> List[Dict[str, Any]]:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers)
+        return list(self._executor.map(lambda job: self.run(*job), jobs))
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for worker in idle:
+            worker.close()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+    def _execute(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        worker = self._checkout()
+        error = "Grading worker crashed"
+        try:
+            result = worker.run(job, self.timeout + 2.0)
+        except TimeoutError:
+            result, error = None, "Grading worker stopped responding"
+        except (OSError, ValueError):
+            result = None
+        if result is None or not worker.alive():
+            # The worker itself is gone or stuck (killed, out of memory); the
+            # job's own limits are enforced inside it and reported normally.
+            worker.close()
+            with self._available:
+                self._started -= 1
+                self._available.notify()
+            return {"error": error, "results": [], "ran": False}
+        with self._available:
+            self._idle.append(worker)
+            self._available.notify()
+        return result
+
+    def _checkout(self) -> _Worker:
+        with self._available:
+            while not self._idle and self._started >= self.workers:
+                self._available.wait()
+            if self._idle:
+                return self._idle.pop()
+            self._started += 1
+        try:
+            return _Worker(self._worker_settings(), self.python)
+        except OSError:
+            with self._available:
+                self._started -= 1
+                self._available.notify()
+            raise
+
+    def _worker_settings(self) -> Dict[str, Any]:
+        uid = gid = 65534
+        if self.isolation and os.name == "posix":
+            import pwd
+            try:
+                entry = pwd.getpwnam(self.user)
+                uid, gid = entry.pw_uid, entry.pw_gid
+            except KeyError:
+                pass
+        return {"isolation": self.isolation, "uid": uid, "gid": gid, "hidden_paths": _hidden_paths()}
+
+    def _summarize(self, raw: Dict[str, Any], expected: List[Any]) -> Dict[str, Any]:
+        results = []
+        for result, want in zip(raw.get("results", []), expected):
+            if "value" in result:
+                try:
+                    value = json.loads(result["value"])
+                except (TypeError, ValueError):
+                    result = {"passed": False, "error": "Result could not be decoded"}
+                else:
+                    result = {"passed": want is not _CHILD_VERDICT and _same(value, want)}
+            elif want is not _CHILD_VERDICT:
+                # Only assert cases may report their own verdict.
+                result = {"passed": False, "error": result.get("error")}
+            results.append(result)
+        return {
+            "passed": sum(1 for r in results if r.get("passed") is True),
+            "total": len(expected),
+            "error": raw.get("error"),
+            "results": results
+        }
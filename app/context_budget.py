@@ -0,0 +1,127 @@
+import os
+import re
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional
+
+DEFAULT_CONTEXT_TOKENS = 3000
+SUMMARY_TOKENS = 80
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+_MARKUP_RE = re.compile(r"^\s*(?:#+|[-*+]|\d+[.)])\s+")
+
+
+@lru_cache(maxsize=1)
+def _encoder() -> Optional[Callable[[str], List[int]]]:
+    # tiktoken ships with langchain-openai. Its first get_encoding() downloads
+    # the BPE file (then cached on disk, see TIKTOKEN_CACHE_DIR), which blocks;
+    # the server calls warm_encoder() in a thread at startup for that reason.
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base").encode
+    except Exception:
+        return None
+
+
+def warm_encoder() -> None:
+    """Load the tokenizer now, so the first count_tokens() call does not block."""
+    _encoder()
+
+
+def count_tokens(text: str) -> int:
+    """Count tokens locally, with tiktoken if available, else a word/punctuation estimate."""
+    encode = _encoder()
+    if encode is not None:
+        return len(encode(text))
+    return len(_TOKEN_RE.findall(text))
+
+
+def summarize_step(content: str, max_tokens: int = SUMMARY_TOKENS) -> str:
+    """Extract the key facts of a teaching step without calling the LLM.
+
+    Takes the first sentence of each paragraph, heading and list item, in
+    order, until max_tokens is reached. Code blocks are skipped.
+    """
+    facts: List[str] = []
+    used = 0
+    in_code = False
+
+    for block in re.split(r"\n\s*\n", content):
+        for line in block.splitlines():
+            if line.strip().startswith("```"):
+                in_code = not in_code
+                continue
+            if in_code or not line.strip():
+                continue
+            text = _MARKUP_RE.sub("", line).replace("**", "").strip()
+            if not text:
+                continue
+            sentence = _SENTENCE_RE.split(text, 1)[0]
+            tokens = count_tokens(sentence)
+            if used + tokens > max_tokens:
+                return " ".join(facts) if facts else _truncate(sentence, max_tokens)
+            facts.append(sentence)
+            used += tokens
+            if not _MARKUP_RE.match(line):
+                # Only the lead sentence of a prose paragraph is kept.
+                break
+
+    return " ".join(facts)
+
+
+def _truncate(text: str, max_tokens: int) -> str:
+    words = text.split()
+    tokens = count_tokens(text)
+    while words and tokens > max_tokens:
+        words = words[: min(len(words) - 1, len(words) * max_tokens // tokens)]
+        text = " ".join(words)
+        tokens = count_tokens(text)
+    return text
+
+
+class ContextBudget:
+    """Fits a lesson's teaching steps into a prompt of at most max_tokens.
+
+    Steps are sent in full while they fit. Otherwise every step is first
+    included by its summary, so all of them stay represented, and steps are
+    then upgraded to full text in order while the budget allows.
+    """
+
+    def __init__(self, max_tokens: int = DEFAULT_CONTEXT_TOKENS):
+        self.max_tokens = max_tokens
+
+    def render(self, topic: str, steps: List[Dict[str, Any]]) -> str:
+        header = f"Topic: {topic}\n\nTeaching Content:\n"
+        full = [self._format(step, step.get("content", "")) for step in steps]
+        full_tokens = [count_tokens(part) for part in full]
+        budget = self.max_tokens - count_tokens(header)
+        if sum(full_tokens) <= budget:
+            return "\n".join([header] + full)
+
+        summaries = [self._format(step, self.summary_for(step)) for step in steps]
+        summary_tokens = [count_tokens(part) for part in summaries]
+        if sum(summary_tokens) > budget:
+            share = max(budget // max(len(steps), 1), 1)
+            return "\n".join([header] + [_truncate(part, share) for part in summaries])
+
+        parts = list(summaries)
+        used = sum(summary_tokens)
+        for index, tokens in enumerate(full_tokens):
+            extra = tokens - summary_tokens[index]
+            if used + extra <= budget:
+                parts[index] = full[index]
+                used += extra
+        return "\n".join([header] + parts)
+
+    def summary_for(self, step: Dict[str, Any]) -> str:
+        summary = step.get("summary")
+        if summary is None:
+            summary = summarize_step(step.get("content", ""))
+        return summary
+
+    def _format(self, step: Dict[str, Any], body: str) -> str:
+        return f"Step {step.get('step_number', 0)}: {step.get('title', '')}\n{body}\n"
+
+
+def create_context_budget() -> ContextBudget:
+    return ContextBudget(int(os.getenv("ASSESSMENT_CONTEXT_TOKENS", str(DEFAULT_CONTEXT_TOKENS))))
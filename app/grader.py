@@ -1,40 +1,175 @@
-from typing import List
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 from app.models import Assessment, Question, QuestionGrade, GradeReport, AssessmentSubmission, QuestionType
+from app.keyword_matcher import KeywordMatcher
+from app.code_runner import CodeRunner
+from app.metrics import GRADE_COMPUTE_SECONDS
+
+CompiledQuestion = Tuple[Question, str, Optional[KeywordMatcher]]
+
+
+def _compile_question(question: Question) -> CompiledQuestion:
+    matcher = None
+    if question.type == QuestionType.SHORT_ANSWER:
+        matcher = KeywordMatcher(question.keywords or [])
+    return question, question.expected_answer.lower().strip(), matcher
+
+
+class GradingKey:
+    """Compact, pre-normalized form of an Assessment used for grading.
+
+    Built once per assessment so submissions do not rebuild and re-validate the
+    stored Assessment model. Questions are kept as (question, normalized expected
+    answer, keyword matcher) triples; the matcher is only built for short answers.
+    """
+    
+    __slots__ = ("assessment_id", "max_score", "pass_threshold", "questions")
+    
+    def __init__(
+        self,
+        assessment_id: str,
+        max_score: float,
+        pass_threshold: float,
+        questions: List[CompiledQuestion]
+    ):
+        self.assessment_id = assessment_id
+        self.max_score = max_score
+        self.pass_threshold = pass_threshold
+        self.questions = questions
+    
+    @classmethod
+    def from_assessment(cls, assessment: Assessment) -> "GradingKey":
+        return cls(
+            assessment.id,
+            float(assessment.total_points),
+            assessment.pass_threshold,
+            [_compile_question(q) for q in assessment.questions]
+        )
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "GradingKey":
+        # Stored assessments were validated when they were created, so the
+        # questions are constructed without running validation again.
+        questions = []
+        for q_data in data["questions"]:
+            question = Question.model_construct(**{**q_data, "type": QuestionType(q_data["type"])})
+            questions.append(_compile_question(question))
+        return cls(
+            data["id"],
+            float(data["total_points"]),
+            data.get("pass_threshold", 0.7),
+            questions
+        )
 
 
 class Grader:
+    # Submissions are graded in chunks so coding answers within a chunk can run
+    # on the code runner's workers in parallel before the chunk is yielded.
+    BATCH_CHUNK_SIZE = 64
+    
+    def __init__(self, max_cached_keys: int = 10000, code_runner: Optional[CodeRunner] = None):
+        self.max_cached_keys = max_cached_keys
+        self.code_runner = code_runner
+        self._keys: "OrderedDict[str, GradingKey]" = OrderedDict()
+    
+    def grading_key(self, assessment_data: Dict[str, Any]) -> GradingKey:
+        assessment_id = assessment_data["id"]
+        key = self._keys.get(assessment_id)
+        if key is None:
+            key = GradingKey.from_dict(assessment_data)
+            self._keys[assessment_id] = key
+            if len(self._keys) > self.max_cached_keys:
+                self._keys.popitem(last=False)
+        else:
+            self._keys.move_to_end(assessment_id)
+        return key
+    
     def grade_assessment(self, assessment: Assessment, submission: AssessmentSubmission) -> GradeReport:
-        question_grades = []
-        answer_map = {a.question_id: a.answer for a in submission.answers}
-        total_score = 0.0
-        max_score = float(assessment.total_points)
-        
-        for question in assessment.questions:
-            answer = answer_map.get(question.id, "")
-            grade = self._grade_question(question, answer)
-            question_grades.append(grade)
-            total_score += grade.score
-        
-        percentage = (total_score / max_score) if max_score > 0 else 0.0
-        passed = percentage >= assessment.pass_threshold
-        
-        return GradeReport(
-            assessment_id=assessment.id,
-            total_score=total_score,
-            max_score=max_score,
-            percentage=percentage,
-            passed=passed,
-            question_grades=question_grades,
-            feedback=self._generate_feedback(question_grades, passed, percentage)
-        )
+        return self.grade_with_key(GradingKey.from_assessment(assessment), submission)
+    
+    def grade_many(
+        self,
+        submissions: Iterable[AssessmentSubmission],
+        load_assessment: Callable[[str], Optional[Dict[str, Any]]]
+    ) -> Iterator[Tuple[AssessmentSubmission, Optional[GradeReport]]]:
+        """Grade a batch of submissions, yielding results as they are graded.
+
+        Each distinct assessment is loaded and compiled once per batch. Yields
+        (submission, None) when the assessment cannot be found.
+        """
+        keys: Dict[str, Optional[GradingKey]] = {}
+        chunk: List[Tuple[AssessmentSubmission, Optional[GradingKey]]] = []
+        for submission in submissions:
+            assessment_id = submission.assessment_id
+            if assessment_id not in keys:
+                assessment_data = load_assessment(assessment_id)
+                keys[assessment_id] = self.grading_key(assessment_data) if assessment_data else None
+            chunk.append((submission, keys[assessment_id]))
+            if len(chunk) >= self.BATCH_CHUNK_SIZE:
+                yield from self._grade_chunk(chunk)
+                chunk = []
+        if chunk:
+            yield from self._grade_chunk(chunk)
     
-    def _grade_question(self, question: Question, answer: str) -> QuestionGrade:
+    def _grade_chunk(
+        self, chunk: List[Tuple[AssessmentSubmission, Optional[GradingKey]]]
+    ) -> Iterator[Tuple[AssessmentSubmission, Optional[GradeReport]]]:
+        if self.code_runner is not None:
+            jobs = []
+            for submission, key in chunk:
+                if key is None:
+                    continue
+                answer_map = {a.question_id: a.answer for a in submission.answers}
+                for question, _, _ in key.questions:
+                    answer = answer_map.get(question.id, "").strip()
+                    if question.type == QuestionType.CODING and question.test_cases and answer:
+                        jobs.append((answer, question.test_cases))
+            if len(jobs) > 1:
+                # Warms the runner's result cache; grading below then hits it.
+                self.code_runner.run_many(jobs)
+        
+        for submission, key in chunk:
+            yield submission, (self.grade_with_key(key, submission) if key is not None else None)
+    
+    def grade_with_key(self, key: GradingKey, submission: AssessmentSubmission) -> GradeReport:
+        with GRADE_COMPUTE_SECONDS.time():
+            question_grades = []
+            answer_map = {a.question_id: a.answer for a in submission.answers}
+            total_score = 0.0
+            max_score = key.max_score
+            
+            for question, expected, matcher in key.questions:
+                answer = answer_map.get(question.id, "")
+                grade = self._grade_question(question, answer, expected, matcher)
+                question_grades.append(grade)
+                total_score += grade.score
+            
+            percentage = (total_score / max_score) if max_score > 0 else 0.0
+            passed = percentage >= key.pass_threshold
+            
+            return GradeReport(
+                assessment_id=key.assessment_id,
+                total_score=total_score,
+                max_score=max_score,
+                percentage=percentage,
+                passed=passed,
+                question_grades=question_grades,
+                feedback=self._generate_feedback(question_grades, passed, percentage)
+            )
+    
+    def _grade_question(
+        self,
+        question: Question,
+        answer: str,
+        expected: Optional[str] = None,
+        matcher: Optional[KeywordMatcher] = None
+    ) -> QuestionGrade:
         answer = answer.strip()
         
         if question.type == QuestionType.MCQ:
-            return self._grade_mcq(question, answer)
+            return self._grade_mcq(question, answer, expected)
         elif question.type == QuestionType.SHORT_ANSWER:
-            return self._grade_short_answer(question, answer)
+            return self._grade_short_answer(question, answer, matcher)
         elif question.type == QuestionType.CODING:
             return self._grade_coding(question, answer)
         
@@ -46,8 +181,10 @@ class Grader:
             feedback="Unknown question type"
         )
     
-    def _grade_mcq(self, question: Question, answer: str) -> QuestionGrade:
-        is_correct = answer.lower().strip() == question.expected_answer.lower().strip()
+    def _grade_mcq(self, question: Question, answer: str, expected: Optional[str] = None) -> QuestionGrade:
+        if expected is None:
+            expected = question.expected_answer.lower().strip()
+        is_correct = answer.lower().strip() == expected
         score = float(question.points) if is_correct else 0.0
         
         return QuestionGrade(
@@ -59,7 +196,9 @@ class Grader:
             remediation_steps=None if is_correct else [1, 2]
         )
     
-    def _grade_short_answer(self, question: Question, answer: str) -> QuestionGrade:
+    def _grade_short_answer(
+        self, question: Question, answer: str, matcher: Optional[KeywordMatcher] = None
+    ) -> QuestionGrade:
         if not answer:
             return QuestionGrade(
                 question_id=question.id,
@@ -70,10 +209,10 @@ class Grader:
                 remediation_steps=[3, 4]
             )
         
-        answer_lower = answer.lower()
-        keywords = [k.lower() for k in (question.keywords or [])]
-        matched_keywords = sum(1 for keyword in keywords if keyword in answer_lower)
-        total_keywords = len(keywords) if keywords else 1
+        if matcher is None:
+            matcher = KeywordMatcher(question.keywords or [])
+        matched_keywords = matcher.count(answer)
+        total_keywords = len(matcher) if len(matcher) else 1
         
         if matched_keywords == total_keywords:
             score = float(question.points)
@@ -124,6 +263,9 @@ class Grader:
                 remediation_steps=[4, 5]
             )
         
+        if question.test_cases and self.code_runner is not None:
+            return self._grade_coding_tests(question, answer)
+        
         rubric_score = 0.0
         if "def" in answer or "class" in answer:
             rubric_score += 0.4
@@ -144,6 +286,30 @@ class Grader:
             remediation_steps=None if is_correct else [4, 5]
         )
     
+    def _grade_coding_tests(self, question: Question, answer: str) -> QuestionGrade:
+        assert self.code_runner is not None and question.test_cases
+        run = self.code_runner.run(answer, question.test_cases)
+        passed, total = run["passed"], run["total"]
+        
+        score = float(question.points) * (passed / total) if total else 0.0
+        is_correct = total > 0 and passed == total
+        
+        if run["error"]:
+            feedback = f"Your code could not be run against the tests: {run['error']}"
+        elif is_correct:
+            feedback = f"Great code! All {total} test cases passed."
+        else:
+            feedback = f"{passed}/{total} test cases passed. Check the failing cases and try again."
+        
+        return QuestionGrade(
+            question_id=question.id,
+            score=score,
+            max_score=float(question.points),
+            is_correct=is_correct,
+            feedback=feedback,
+            remediation_steps=None if is_correct else [4, 5]
+        )
+    
     def _generate_feedback(self, question_grades: List[QuestionGrade], passed: bool, percentage: float) -> str:
         correct_count = sum(1 for g in question_grades if g.is_correct)
         total_questions = len(question_grades)
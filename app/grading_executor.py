@@ -0,0 +1,161 @@
+import asyncio
+import threading
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Set
+
+from app.grader import Grader, GradingKey
+from app.models import AssessmentSubmission, GradeReport, QuestionType
+from app.metrics import GRADING_SECONDS
+
+MAX_FAILURES = 1000
+
+
+class GradingQueueFull(Exception):
+    pass
+
+
+_process_grader: Optional[Grader] = None
+
+
+def _grade_in_process(key: GradingKey, submission: AssessmentSubmission) -> GradeReport:
+    global _process_grader
+    if _process_grader is None:
+        _process_grader = Grader()
+    return _process_grader.grade_with_key(key, submission)
+
+
+class GradingExecutor:
+    """Runs grading off the event loop with a bound on queued work.
+
+    Assessments with coding questions go to a thread pool sized for the code
+    runner, since those threads mostly wait on sandbox workers. Everything else
+    goes to a small thread pool, or to a process pool when process_workers is
+    set, for CPU-heavy keyword grading.
+    """
+
+    def __init__(
+        self,
+        grader: Grader,
+        thread_workers: int = 4,
+        coding_workers: int = 8,
+        process_workers: int = 0,
+        max_queue_depth: int = 1000
+    ):
+        self.grader = grader
+        self.max_queue_depth = max_queue_depth
+        self._light_pool: Executor = ThreadPoolExecutor(max_workers=thread_workers, thread_name_prefix="grading")
+        self._coding_pool: Executor = ThreadPoolExecutor(max_workers=coding_workers, thread_name_prefix="grading-code")
+        self._process_pool: Optional[Executor] = (
+            ProcessPoolExecutor(max_workers=process_workers) if process_workers > 0 else None
+        )
+        self._depth = 0
+        self._depth_lock = threading.Lock()
+        # Counts per assessment, since one assessment can have several
+        # background grades in flight at once.
+        self._pending: Dict[str, int] = {}
+        # Latest background failure per assessment, until it is submitted again.
+        self._failures: "OrderedDict[str, str]" = OrderedDict()
+        self._background: Set[asyncio.Task] = set()
+        self.rejected = 0
+        self.failed = 0
+
+    @property
+    def depth(self) -> int:
+        return self._depth
+
+    def is_pending(self, assessment_id: str) -> bool:
+        return assessment_id in self._pending
+
+    def failure(self, assessment_id: str) -> Optional[str]:
+        """Error from the last background grade of an assessment, if it failed."""
+        return self._failures.get(assessment_id)
+
+    async def grade(self, key: GradingKey, submission: AssessmentSubmission) -> GradeReport:
+        self._reserve()
+        try:
+            return await self._run(key, submission)
+        finally:
+            self.release()
+
+    def reserve(self, count: int) -> None:
+        """Count work graded elsewhere (e.g. a bulk batch) against the queue bound.
+
+        Callers must release() each slot when its submission is done.
+        """
+        self._reserve(count)
+
+    def release(self, count: int = 1) -> None:
+        with self._depth_lock:
+            self._depth -= count
+
+    def submit_background(
+        self,
+        key: GradingKey,
+        submission: AssessmentSubmission,
+        on_done: Callable[[GradeReport], None],
+        on_error: Optional[Callable[[str], None]] = None
+    ) -> None:
+        self._reserve()
+        assessment_id = key.assessment_id
+        self._pending[assessment_id] = self._pending.get(assessment_id, 0) + 1
+        self._failures.pop(assessment_id, None)
+
+        async def run() -> None:
+            try:
+                on_done(await self._run(key, submission))
+            except Exception as e:
+                # Nobody awaits this task, so the error is kept for get_grade
+                # and handed to on_error instead of being lost.
+                error = f"{type(e).__name__}: {e}"
+                self.failed += 1
+                self._failures[assessment_id] = error
+                self._failures.move_to_end(assessment_id)
+                while len(self._failures) > MAX_FAILURES:
+                    self._failures.popitem(last=False)
+                if on_error is not None:
+                    on_error(error)
+            finally:
+                self.release()
+                remaining = self._pending[assessment_id] - 1
+                if remaining:
+                    self._pending[assessment_id] = remaining
+                else:
+                    del self._pending[assessment_id]
+
+        task = asyncio.create_task(run())
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": self._depth,
+            "max_queue_depth": self.max_queue_depth,
+            "pending_background": sum(self._pending.values()),
+            "failed_background": self.failed,
+            "rejected": self.rejected
+        }
+
+    def shutdown(self) -> None:
+        self._light_pool.shutdown(wait=False)
+        self._coding_pool.shutdown(wait=False)
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False)
+
+    def _reserve(self, count: int = 1) -> None:
+        with self._depth_lock:
+            if self._depth + count > self.max_queue_depth:
+                self.rejected += 1
+                raise GradingQueueFull(f"Grading queue is full ({self.max_queue_depth} submissions)")
+            self._depth += count
+
+    async def _run(self, key: GradingKey, submission: AssessmentSubmission) -> GradeReport:
+        loop = asyncio.get_running_loop()
+        if any(q.type == QuestionType.CODING for q, _, _ in key.questions):
+            with GRADING_SECONDS.time("coding"):
+                return await loop.run_in_executor(self._coding_pool, self.grader.grade_with_key, key, submission)
+        if self._process_pool is not None:
+            with GRADING_SECONDS.time("process"):
+                return await loop.run_in_executor(self._process_pool, _grade_in_process, key, submission)
+        with GRADING_SECONDS.time("thread"):
+            return await loop.run_in_executor(self._light_pool, self.grader.grade_with_key, key, submission)
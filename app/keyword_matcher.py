@@ -0,0 +1,79 @@
+import re
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Set, Tuple
+
+_TOKEN_RE = re.compile(r"[^\W_]+(?:['’][^\W_]+)*", re.UNICODE)
+
+
+@lru_cache(maxsize=65536)
+def _stem(token: str) -> str:
+    # Light suffix stripping so "decorates"/"decorated"/"decorate" match each
+    # other; deliberately conservative on short words.
+    if len(token) <= 4:
+        return token
+    if token.endswith(("ies", "ied")):
+        return token[:-3] + "y"
+    if token.endswith("ing") and len(token) >= 6:
+        token = token[:-3]
+    elif token.endswith("ed") and len(token) >= 5:
+        token = token[:-2]
+    elif token.endswith(("sses", "xes", "zes", "ches", "shes")):
+        token = token[:-2]
+    elif token.endswith("s") and not token.endswith(("ss", "us", "is")):
+        token = token[:-1]
+    if token.endswith("e") and len(token) > 4:
+        token = token[:-1]
+    return token
+
+
+class KeywordMatcher:
+    """Whole-word keyword matcher compiled once per question.
+
+    Keywords and answers are tokenized (and optionally stemmed) the same way.
+    Single-word keywords are matched with one set intersection and phrases are
+    only compared where their first word occurs, so a submission costs
+    O(answer length) rather than O(keywords x answer length), and partial-word
+    matches like "class" in "classic" are rejected.
+    """
+
+    def __init__(self, keywords: Iterable[str], stem: bool = True):
+        self.stem = stem
+        phrases: List[Tuple[str, ...]] = []
+        seen: Set[Tuple[str, ...]] = set()
+        for keyword in keywords:
+            phrase = self._normalize(keyword)
+            if phrase and phrase not in seen:
+                seen.add(phrase)
+                phrases.append(phrase)
+        self.phrases = phrases
+        self._words = frozenset(p[0] for p in phrases if len(p) == 1)
+        self._by_first: Dict[str, List[Tuple[str, ...]]] = {}
+        for phrase in phrases:
+            if len(phrase) > 1:
+                self._by_first.setdefault(phrase[0], []).append(phrase)
+
+    def __len__(self) -> int:
+        return len(self.phrases)
+
+    def matches(self, answer: str) -> FrozenSet[Tuple[str, ...]]:
+        if not self.phrases:
+            return frozenset()
+        tokens = self._normalize(answer)
+        unique = set(tokens)
+        found: Set[Tuple[str, ...]] = {(w,) for w in self._words.intersection(unique)}
+        
+        if self._by_first and not unique.isdisjoint(self._by_first):
+            for start, token in enumerate(tokens):
+                for phrase in self._by_first.get(token, ()):
+                    if phrase not in found and tokens[start:start + len(phrase)] == phrase:
+                        found.add(phrase)
+        return frozenset(found)
+
+    def count(self, answer: str) -> int:
+        return len(self.matches(answer))
+
+    def _normalize(self, text: str) -> Tuple[str, ...]:
+        tokens = _TOKEN_RE.findall(text.lower())
+        if self.stem:
+            return tuple(_stem(t) for t in tokens)
+        return tuple(tokens)
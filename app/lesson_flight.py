@@ -0,0 +1,185 @@
+import uuid
+import asyncio
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from app.models import Difficulty
+from app.step_cache import normalize_topic
+
+
+class _Flight:
+    def __init__(self, key: Optional[Tuple[Any, ...]], thread_id: str):
+        self.key = key
+        self.thread_id = thread_id
+        self.events: List[Dict[str, Any]] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.changed = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+    def publish(self, event: Dict[str, Any]) -> None:
+        self.events.append(event)
+        self._wake()
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        self.done = True
+        self.error = error
+        self._wake()
+
+    def _wake(self) -> None:
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+
+class LessonFlights:
+    """Single-flight layer in front of TutorAgent.stream_teaching.
+
+    Sessions asking for the same normalized topic (cache_topic, when given)
+    with the same generation settings while a lesson is already being generated subscribe to that run
+    instead of starting their own. Every subscriber gets the full event stream:
+    late joiners first replay what has been produced so far, then follow live.
+    The run keeps going while at least one subscriber is attached, and each
+    subscriber receives its own copy of the assessment with a fresh id.
+
+    Each run is checkpointed under its own thread id, which join() returns so
+    the caller can later resume() it: a reconnect either rejoins the run if it
+    is still going, or replays the checkpoint and generates only what is
+    missing. Checkpoints are discarded once a run completes, or by discard()
+    when the session that could resume it is gone.
+    """
+
+    def __init__(self, agent: Any):
+        self.agent = agent
+        self._flights: Dict[Tuple[Any, ...], _Flight] = {}
+        self._threads: Dict[str, _Flight] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.started = 0
+        self.joined = 0
+        self.resumed = 0
+
+    def join(
+        self,
+        topic: str,
+        session_id: str,
+        stream_tokens: bool = False,
+        use_cache: bool = True,
+        parallel: bool = False,
+        pipeline_assessment: bool = False,
+        total_steps: int = 5,
+        difficulty: Difficulty = "medium",
+        cache_topic: Optional[str] = None
+    ) -> Tuple[str, AsyncIterator[Dict[str, Any]]]:
+        settings = {
+            "stream_tokens": stream_tokens,
+            "use_cache": use_cache,
+            "parallel": parallel,
+            "pipeline_assessment": pipeline_assessment,
+            "total_steps": total_steps,
+            "difficulty": difficulty
+        }
+        # A forced refresh must not be answered from someone else's run.
+        key = (normalize_topic(cache_topic or topic), *settings.values()) if use_cache else None
+        flight = self._flights.get(key) if key is not None else None
+        if flight is None:
+            thread_id = f"{session_id}:{uuid.uuid4().hex}"
+            flight = self._start(key, thread_id, self.agent.stream_teaching(
+                topic, thread_id, cache_topic=cache_topic, **settings
+            ))
+            self.started += 1
+        else:
+            self.joined += 1
+        return flight.thread_id, self._subscribe(flight)
+
+    async def resume(
+        self,
+        thread_id: str,
+        stream_tokens: bool = False,
+        parallel: bool = False
+    ) -> Optional[AsyncIterator[Dict[str, Any]]]:
+        flight = self._threads.get(thread_id)
+        if flight is None:
+            if not await self.agent.has_checkpoint(thread_id, parallel):
+                return None
+            flight = self._threads.get(thread_id) or self._start(None, thread_id, self.agent.resume_teaching(
+                thread_id, stream_tokens=stream_tokens, parallel=parallel
+            ))
+        self.resumed += 1
+        return self._subscribe(flight)
+
+    def discard(self, thread_id: str) -> None:
+        """Drop the checkpoint of a run nobody will resume, unless it is still going.
+
+        Safe to call from any thread, e.g. a store's eviction hook.
+        """
+        if self._loop is None or thread_id in self._threads:
+            return
+        asyncio.run_coroutine_threadsafe(self.agent.discard_checkpoint(thread_id), self._loop)
+
+    def _start(self, key: Optional[Tuple[Any, ...]], thread_id: str, events: AsyncIterator[Dict[str, Any]]) -> _Flight:
+        self._loop = asyncio.get_running_loop()
+        flight = _Flight(key, thread_id)
+        if key is not None:
+            self._flights[key] = flight
+        self._threads[thread_id] = flight
+        flight.task = asyncio.create_task(self._run(flight, events))
+        return flight
+
+    async def _subscribe(self, flight: _Flight) -> AsyncIterator[Dict[str, Any]]:
+        flight.subscribers += 1
+        try:
+            cursor = 0
+            while True:
+                changed = flight.changed
+                while cursor < len(flight.events):
+                    event = flight.events[cursor]
+                    cursor += 1
+                    yield self._for_session(event)
+                if flight.done:
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+                await changed.wait()
+        finally:
+            flight.subscribers -= 1
+            if flight.subscribers == 0 and not flight.done and flight.task is not None:
+                flight.task.cancel()
+                self._forget(flight)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self._threads),
+            "subscribers": sum(f.subscribers for f in self._threads.values()),
+            "started": self.started,
+            "joined": self.joined,
+            "resumed": self.resumed
+        }
+
+    async def _run(self, flight: _Flight, events: AsyncIterator[Dict[str, Any]]) -> None:
+        try:
+            async for event in events:
+                flight.publish(event)
+        except asyncio.CancelledError:
+            # Abandoned by every subscriber; the checkpoint is kept for resume().
+            flight.finish()
+            raise
+        except Exception as e:
+            flight.finish(e)
+        else:
+            flight.finish()
+            await self.agent.discard_checkpoint(flight.thread_id)
+        finally:
+            self._forget(flight)
+
+    def _forget(self, flight: _Flight) -> None:
+        # New sessions after this point start a fresh run (normally served by
+        # the step cache) rather than replaying a finished one.
+        if flight.key is not None and self._flights.get(flight.key) is flight:
+            del self._flights[flight.key]
+        if self._threads.get(flight.thread_id) is flight:
+            del self._threads[flight.thread_id]
+
+    def _for_session(self, event: Dict[str, Any]) -> Dict[str, Any]:
+        if event["type"] != "assessment.ready":
+            return event
+        assessment = {**event["data"]["assessment"], "id": str(uuid.uuid4())}
+        return {**event, "data": {**event["data"], "assessment": assessment}}
@@ -0,0 +1,291 @@
+import os
+import json
+import time
+import random
+import asyncio
+import hashlib
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import httpx
+from langchain_openai import ChatOpenAI
+from dotenv import load_dotenv
+
+from app.metrics import LLM_FIRST_TOKEN_SECONDS, LLM_REQUEST_SECONDS, LLM_RETRIES, LLM_TOKENS
+
+load_dotenv()
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+RETRYABLE_ERRORS = {"RateLimitError", "APITimeoutError", "APIConnectionError", "InternalServerError"}
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = float(max(burst, 1))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def _is_retryable(error: BaseException) -> bool:
+    if type(error).__name__ in RETRYABLE_ERRORS:
+        return True
+    return getattr(error, "status_code", None) in RETRYABLE_STATUS
+
+
+def _retry_after(error: BaseException) -> Optional[float]:
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    value = headers.get("retry-after")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _record_usage(model: str, message: Any) -> None:
+    usage = getattr(message, "usage_metadata", None)
+    if usage:
+        LLM_TOKENS.inc(usage.get("input_tokens", 0), model, "input")
+        LLM_TOKENS.inc(usage.get("output_tokens", 0), model, "output")
+
+
+def _message_key(model: str, temperature: float, messages: List[Any]) -> str:
+    payload = [(type(m).__name__, getattr(m, "content", m)) for m in messages]
+    raw = json.dumps([model, temperature, payload], default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class GatewayChatModel:
+    """Chat model handle routed through an LLMGateway.
+
+    Exposes the ainvoke/astream subset the tutor uses, so it can stand in for
+    ChatOpenAI anywhere in the app.
+    """
+
+    def __init__(self, gateway: "LLMGateway", llm: Any, model_name: str, temperature: float):
+        self.gateway = gateway
+        self.llm = llm
+        self.model_name = model_name
+        self.temperature = temperature
+
+    async def ainvoke(self, messages: List[Any], **kwargs) -> Any:
+        return await self.gateway.ainvoke(self, messages, **kwargs)
+
+    def astream(self, messages: List[Any], **kwargs) -> AsyncIterator[Any]:
+        return self.gateway.astream(self, messages, **kwargs)
+
+
+class LLMGateway:
+    """Single entry point for all LLM calls in the process.
+
+    Shares one pooled HTTP client between models and applies, in order: request
+    coalescing for identical in-flight prompts, a global and per-model
+    concurrency limit, a token-bucket rate limit, and jittered exponential
+    retry on rate-limit and transient errors.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 32,
+        model_concurrency: Optional[Dict[str, int]] = None,
+        rate_per_second: float = 0.0,
+        burst: int = 10,
+        max_retries: int = 4,
+        base_delay: float = 0.5,
+        max_delay: float = 20.0,
+        max_connections: int = 100,
+        http_client: Optional[httpx.AsyncClient] = None
+    ):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._global_slots = asyncio.Semaphore(max_concurrency)
+        self._model_limits = dict(model_concurrency or {})
+        self._model_slots: Dict[str, asyncio.Semaphore] = {}
+        self._bucket = TokenBucket(rate_per_second, burst) if rate_per_second > 0 else None
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._http_client = http_client or httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            timeout=httpx.Timeout(120.0, connect=10.0)
+        )
+        self._models: Dict[Tuple[str, float], GatewayChatModel] = {}
+        self.stats: Dict[str, int] = {"calls": 0, "coalesced": 0, "retries": 0, "failures": 0}
+
+    def chat_model(self, model: str = "gpt-4", temperature: float = 0.7) -> GatewayChatModel:
+        key = (model, temperature)
+        handle = self._models.get(key)
+        if handle is None:
+            api_key = os.getenv("OPENAI_API_KEY")
+            llm = ChatOpenAI(
+                model=model,
+                temperature=temperature,
+                api_key=api_key,
+                max_retries=0,
+                http_async_client=self._http_client
+            )
+            handle = GatewayChatModel(self, llm, model, temperature)
+            self._models[key] = handle
+        return handle
+
+    def wrap(self, llm: Any, model: str, temperature: float = 0.7) -> GatewayChatModel:
+        return GatewayChatModel(self, llm, model, temperature)
+
+    async def ainvoke(self, handle: GatewayChatModel, messages: List[Any], **kwargs) -> Any:
+        key = _message_key(handle.model_name, handle.temperature, messages)
+        existing = self._in_flight.get(key)
+        if existing is not None:
+            self.stats["coalesced"] += 1
+            try:
+                return await asyncio.shield(existing)
+            except asyncio.CancelledError:
+                # Only fall through to our own call if the leader was cancelled,
+                # not if this caller was.
+                if not existing.cancelled():
+                    raise
+
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            with LLM_REQUEST_SECONDS.time(handle.model_name, "invoke"):
+                result = await self._call_with_retry(handle, lambda: handle.llm.ainvoke(messages, **kwargs))
+            _record_usage(handle.model_name, result)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+
+    async def astream(self, handle: GatewayChatModel, messages: List[Any], **kwargs) -> AsyncIterator[Any]:
+        attempt = 0
+        begin = time.perf_counter()
+        async with self._slots(handle.model_name):
+            while True:
+                await self._throttle()
+                self.stats["calls"] += 1
+                started = False
+                try:
+                    async for chunk in handle.llm.astream(messages, **kwargs):
+                        if not started:
+                            started = True
+                            LLM_FIRST_TOKEN_SECONDS.observe(time.perf_counter() - begin, handle.model_name)
+                        _record_usage(handle.model_name, chunk)
+                        yield chunk
+                    LLM_REQUEST_SECONDS.observe(time.perf_counter() - begin, handle.model_name, "stream")
+                    return
+                except Exception as e:
+                    # Chunks already sent cannot be taken back, so only retry
+                    # failures that happen before the first chunk.
+                    if started or not _is_retryable(e) or attempt >= self.max_retries:
+                        self.stats["failures"] += 1
+                        raise
+                    attempt += 1
+                    self.stats["retries"] += 1
+                    LLM_RETRIES.inc(1, handle.model_name)
+                    await asyncio.sleep(self._backoff(attempt, e))
+
+    async def aclose(self) -> None:
+        await self._http_client.aclose()
+
+    async def _call_with_retry(self, handle: GatewayChatModel, call) -> Any:
+        attempt = 0
+        async with self._slots(handle.model_name):
+            while True:
+                await self._throttle()
+                self.stats["calls"] += 1
+                try:
+                    return await call()
+                except Exception as e:
+                    if not _is_retryable(e) or attempt >= self.max_retries:
+                        self.stats["failures"] += 1
+                        raise
+                    attempt += 1
+                    self.stats["retries"] += 1
+                    LLM_RETRIES.inc(1, handle.model_name)
+                    await asyncio.sleep(self._backoff(attempt, e))
+
+    def _backoff(self, attempt: int, error: BaseException) -> float:
+        retry_after = _retry_after(error)
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        # Full jitter keeps a burst of 429s from retrying in lockstep.
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    async def _throttle(self) -> None:
+        if self._bucket is not None:
+            await self._bucket.acquire()
+
+    def _slots(self, model: str) -> "_Slots":
+        semaphore = self._model_slots.get(model)
+        if semaphore is None and model in self._model_limits:
+            semaphore = asyncio.Semaphore(self._model_limits[model])
+            self._model_slots[model] = semaphore
+        return _Slots(self._global_slots, semaphore)
+
+
+class _Slots:
+    def __init__(self, global_slots: asyncio.Semaphore, model_slots: Optional[asyncio.Semaphore]):
+        self.global_slots = global_slots
+        self.model_slots = model_slots
+
+    async def __aenter__(self) -> None:
+        if self.model_slots is not None:
+            await self.model_slots.acquire()
+        try:
+            await self.global_slots.acquire()
+        except BaseException:
+            if self.model_slots is not None:
+                self.model_slots.release()
+            raise
+
+    async def __aexit__(self, *exc) -> None:
+        self.global_slots.release()
+        if self.model_slots is not None:
+            self.model_slots.release()
+
+
+def _parse_model_limits(value: str) -> Dict[str, int]:
+    limits = {}
+    for item in value.split(","):
+        if "=" in item:
+            model, limit = item.split("=", 1)
+            limits[model.strip()] = int(limit)
+    return limits
+
+
+def create_llm_gateway() -> LLMGateway:
+    return LLMGateway(
+        max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "32")),
+        model_concurrency=_parse_model_limits(os.getenv("LLM_MODEL_CONCURRENCY", "")),
+        rate_per_second=float(os.getenv("LLM_RATE_PER_SECOND", "0")),
+        burst=int(os.getenv("LLM_RATE_BURST", "10")),
+        max_retries=int(os.getenv("LLM_MAX_RETRIES", "4"))
+    )
+
+
+_default_gateway: Optional[LLMGateway] = None
+
+
+def get_default_gateway() -> LLMGateway:
+    global _default_gateway
+    if _default_gateway is None:
+        _default_gateway = create_llm_gateway()
+    return _default_gateway
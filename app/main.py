@@ -1,13 +1,31 @@
+import os
 import json
-from typing import Dict
+import asyncio
+from typing import Any, Dict, Optional
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from datetime import datetime
 
-from app.models import AssessmentSubmission, RetakeRequest
-from app.agent import TutorAgent
+from app.models import AssessmentSubmission, BulkSubmission, GradeReport, RetakeRequest
+from app.agent import TutorAgent, DEFAULT_LESSON_STEPS, MAX_LESSON_STEPS, DIFFICULTY_GUIDANCE
 from app.grader import Grader
-from app.assessment_generator import AssessmentGenerator
+from app.code_runner import CodeRunner
+from app.grading_executor import GradingExecutor, GradingQueueFull
+from app.assessment_generator import AssessmentGenerator, AssessmentGenerationError
+from app.step_cache import create_step_cache
+from app.assessment_pool import AssessmentPool
+from app.store import create_store
+from app.assessment_index import AssessmentIndex
+from app.attempt_log import create_attempt_log
+from app.llm_gateway import get_default_gateway
+from app.lesson_flight import LessonFlights
+from app.checkpoints import create_checkpointer
+from app.broker import create_broker
+from app.session_router import SessionRouter
+from app.topic_index import create_topic_index
+from app.context_budget import warm_encoder
+from app.metrics import metrics, WEBSOCKET_SEND_SECONDS
 
 app = FastAPI(title="LangGraph Tutor API", version="1.0.0")
 
@@ -19,14 +37,143 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-sessions: Dict[str, dict] = {}
-assessments: Dict[str, dict] = {}
-grade_reports: Dict[str, dict] = {}
-active_connections: Dict[str, WebSocket] = {}
+sessions = create_store("sessions")
+assessments = create_store("assessments")
+grade_reports = create_store("grade_reports")
+assessment_index = AssessmentIndex(
+    sessions,
+    assessments,
+    links=create_store("assessment_links"),
+    topics=create_store("topic_assessments")
+)
+session_router = SessionRouter(create_broker(), create_store("session_routes"))
+
+llm_gateway = get_default_gateway()
+assessment_generator = AssessmentGenerator(llm=llm_gateway.chat_model("gpt-4", temperature=0.9))
+tutor_agent = TutorAgent(
+    llm=llm_gateway.chat_model("gpt-4", temperature=0.7),
+    assessment_generator=assessment_generator,
+    step_cache=create_step_cache()
+)
+lesson_flights = LessonFlights(tutor_agent)
+unlink_session = sessions.on_evict
+
+
+def on_session_evicted(session_id: str, session: Dict[str, Any]) -> None:
+    # A lesson abandoned mid-way keeps its checkpoint for resuming; once the
+    # session is gone nobody can resume it.
+    if unlink_session is not None:
+        unlink_session(session_id, session)
+    if session.get("thread_id") and not session.get("completed"):
+        lesson_flights.discard(session["thread_id"])
+
+
+sessions.on_evict = on_session_evicted
+topic_index = create_topic_index()
+grader = Grader(code_runner=CodeRunner(
+    workers=int(os.getenv("CODE_RUNNER_WORKERS", "0")) or None,
+    timeout=float(os.getenv("CODE_RUNNER_TIMEOUT_SECONDS", "5")),
+    memory_mb=int(os.getenv("CODE_RUNNER_MEMORY_MB", "256")),
+    isolation=os.getenv("CODE_RUNNER_ISOLATION", "1").lower() not in ("0", "false", "no"),
+    user=os.getenv("CODE_RUNNER_USER", "nobody"),
+    python=os.getenv("CODE_RUNNER_PYTHON") or None
+))
+attempt_log = create_attempt_log()
+grading_executor = GradingExecutor(
+    grader,
+    process_workers=int(os.getenv("GRADING_PROCESS_WORKERS", "0")),
+    max_queue_depth=int(os.getenv("GRADING_MAX_QUEUE_DEPTH", "1000"))
+)
+assessment_pool = AssessmentPool(
+    assessment_generator,
+    target_depth=int(os.getenv("ASSESSMENT_POOL_DEPTH", "2")),
+    max_topics=int(os.getenv("ASSESSMENT_POOL_MAX_TOPICS", "200"))
+)
+
+
+def cache_hit_ratios() -> Dict[tuple, float]:
+    ratios = {("retake_pool",): assessment_pool.stats()["hit_rate"]}
+    if tutor_agent.step_cache is not None:
+        ratios[("step",)] = tutor_agent.step_cache.stats()["hit_rate"]
+    if topic_index is not None:
+        ratios[("topic",)] = topic_index.stats()["hit_rate"]
+    calls = llm_gateway.stats["calls"] + llm_gateway.stats["coalesced"]
+    ratios[("llm_coalesced",)] = (llm_gateway.stats["coalesced"] / calls) if calls else 0.0
+    return ratios
+
+
+metrics.gauge("tutor_cache_hit_ratio", "Hit ratio of each cache since start", ("cache",), cache_hit_ratios)
+metrics.gauge(
+    "tutor_grading_queue_depth",
+    "Submissions waiting for or being graded",
+    callback=lambda: {(): grading_executor.depth}
+)
 
-tutor_agent = TutorAgent()
-grader = Grader()
-assessment_generator = AssessmentGenerator()
+
+@app.on_event("startup")
+async def open_checkpointer():
+    # The SQLite saver binds to the running event loop, so it is opened here
+    # rather than at import time.
+    tutor_agent.set_checkpointer(create_checkpointer())
+
+
+@app.on_event("startup")
+async def load_token_counter():
+    # Lessons count tokens on the event loop, and tiktoken downloads its
+    # encoding on first use, so that happens here in a thread instead.
+    await asyncio.get_running_loop().run_in_executor(None, warm_encoder)
+
+
+@app.on_event("startup")
+async def start_loop_monitor():
+    metrics.start_loop_monitor(float(os.getenv("METRICS_LOOP_LAG_INTERVAL", "0.5")))
+
+
+@app.on_event("shutdown")
+def flush_topic_index():
+    if topic_index is not None:
+        topic_index.flush()
+
+
+def record_attempt(
+    submission: AssessmentSubmission, topic: str, grade_report: GradeReport, from_session: bool = True
+) -> None:
+    # Only a student's own submission can be filed under the session that
+    # produced the assessment; bulk uploads without a student_id are anonymous.
+    student_id = submission.student_id
+    if student_id is None and from_session:
+        student_id = assessment_index.session_id_for(submission.assessment_id)
+    attempt_log.record(student_id or "anonymous", topic, grade_report, submission.submitted_at.isoformat())
+
+
+def store_grade(
+    submission: AssessmentSubmission, topic: str, grade_report: GradeReport, from_session: bool = True
+) -> dict:
+    report = grade_report.model_dump(mode='json')
+    grade_reports.set(submission.assessment_id, report)
+    record_attempt(submission, topic, grade_report, from_session)
+    return report
+
+
+def finish_background_grade(submission: AssessmentSubmission, topic: str, grade_report: GradeReport) -> None:
+    report = store_grade(submission, topic, grade_report)
+    session_id = assessment_index.session_id_for(submission.assessment_id)
+    if session_id is not None:
+        session_router.send_soon(session_id, {
+            "type": "grading.complete",
+            "data": {"assessment_id": submission.assessment_id, "grade_report": report},
+            "timestamp": datetime.now().isoformat()
+        })
+
+
+def fail_background_grade(assessment_id: str, error: str) -> None:
+    session_id = assessment_index.session_id_for(assessment_id)
+    if session_id is not None:
+        session_router.send_soon(session_id, {
+            "type": "grading.failed",
+            "data": {"assessment_id": assessment_id, "message": f"Grading failed: {error}"},
+            "timestamp": datetime.now().isoformat()
+        })
 
 
 @app.get("/")
@@ -43,81 +190,265 @@ async def root():
     }
 
 
+async def replay_session(session: Dict[str, Any]):
+    for step in session["steps_completed"]:
+        yield {"type": "tutor.step", "data": step}
+    assessment = assessments.get(session["assessment"]) if session.get("assessment") else None
+    if assessment is not None:
+        yield {"type": "assessment.ready", "data": {"assessment": assessment}}
+    yield {"type": "tutor.complete", "data": {"message": "Teaching session completed!"}}
+
+
+async def resume_lesson(session_id: str, session: Dict[str, Any]):
+    if session.get("completed"):
+        return replay_session(session)
+    
+    settings = session["settings"]
+    events = await lesson_flights.resume(
+        session["thread_id"],
+        stream_tokens=settings["stream_tokens"],
+        parallel=settings["parallel"]
+    )
+    if events is None:
+        # No checkpoint left (e.g. restart with the in-memory saver); start
+        # over, which the step cache keeps cheap for steps already taught.
+        session["thread_id"], events = lesson_flights.join(
+            session.get("requested_topic", session["topic"]),
+            session_id,
+            cache_topic=session["topic"],
+            total_steps=session["total_steps"],
+            difficulty=session["difficulty"],
+            **settings
+        )
+        sessions.set(session_id, session)
+    return events
+
+
 @app.websocket("/ws/{session_id}")
 async def websocket_endpoint(websocket: WebSocket, session_id: str):
     await websocket.accept()
-    active_connections[session_id] = websocket
+    session_router.connect(session_id, websocket)
     
     try:
+        session = sessions.get(session_id)
+        resumed = session is not None and bool(session.get("thread_id"))
         await websocket.send_json({
             "type": "session.start",
             "data": {
                 "session_id": session_id,
-                "message": "Session started. Please send topic to begin teaching."
+                "resumed": resumed,
+                "message": (
+                    "Resuming session."
+                    if resumed else "Session started. Please send topic to begin teaching."
+                )
             },
             "timestamp": datetime.now().isoformat()
         })
         
-        topic_data = await websocket.receive_json()
-        topic = topic_data.get("topic", "")
-        
-        if not topic:
-            await websocket.send_json({
-                "type": "error",
-                "data": {"message": "Topic is required"},
-                "timestamp": datetime.now().isoformat()
-            })
-            return
+        if resumed:
+            assert session is not None
+            events = await resume_lesson(session_id, session)
+        else:
+            topic_data = await websocket.receive_json()
+            topic = topic_data.get("topic", "")
+            settings = {
+                "stream_tokens": bool(topic_data.get("stream", False)),
+                "use_cache": bool(topic_data.get("use_cache", True)),
+                "parallel": bool(topic_data.get("parallel", False)),
+                "pipeline_assessment": bool(topic_data.get("pipeline_assessment", False))
+            }
+            total_steps = topic_data.get("steps", DEFAULT_LESSON_STEPS)
+            difficulty = topic_data.get("difficulty", "medium")
+            
+            error = None
+            if not topic:
+                error = "Topic is required"
+            elif not isinstance(total_steps, int) or not 1 <= total_steps <= MAX_LESSON_STEPS:
+                error = f"steps must be an integer between 1 and {MAX_LESSON_STEPS}"
+            elif difficulty not in DIFFICULTY_GUIDANCE:
+                error = f"difficulty must be one of: {', '.join(DIFFICULTY_GUIDANCE)}"
+            
+            if error:
+                await websocket.send_json({
+                    "type": "error",
+                    "data": {"message": error},
+                    "timestamp": datetime.now().isoformat()
+                })
+                return
+            
+            # Rephrasings of a known topic share its cached lessons, steps and
+            # retake assessments, but the lesson is taught as it was asked for.
+            cache_topic = topic
+            if topic_index is not None and settings["use_cache"]:
+                # The lookup scans every known topic, so it runs off the loop.
+                cache_topic = await asyncio.get_running_loop().run_in_executor(None, topic_index.resolve, topic)
+            
+            thread_id, events = lesson_flights.join(
+                topic,
+                session_id,
+                cache_topic=cache_topic,
+                total_steps=total_steps,
+                difficulty=difficulty,
+                **settings
+            )
+            session = {
+                "topic": cache_topic,
+                "requested_topic": topic,
+                "total_steps": total_steps,
+                "difficulty": difficulty,
+                "settings": settings,
+                "thread_id": thread_id,
+                "completed": False,
+                "started_at": datetime.now().isoformat(),
+                "steps_completed": [],
+                "assessment": None,
+                "assessments": []
+            }
+            sessions.set(session_id, session)
         
-        sessions[session_id] = {
-            "topic": topic,
-            "started_at": datetime.now().isoformat(),
-            "steps_completed": [],
-            "assessment": None
-        }
+        topic = session["topic"]
+        taught = {step["step_number"] for step in session["steps_completed"]}
+        stored_assessment = assessments.get(session["assessment"]) if session.get("assessment") else None
         
-        async for message in tutor_agent.stream_teaching(topic, session_id):
-            await websocket.send_json({
-                **message,
-                "timestamp": datetime.now().isoformat()
-            })
+        async for message in events:
+            if message["type"] == "assessment.ready" and stored_assessment is not None:
+                # Resumed sessions keep the assessment they were already given.
+                message = {**message, "data": {"assessment": stored_assessment}}
+            
+            with WEBSOCKET_SEND_SECONDS.time(message["type"]):
+                await websocket.send_json({
+                    **message,
+                    "timestamp": datetime.now().isoformat()
+                })
             
-            if message["type"] == "tutor.step":
-                sessions[session_id]["steps_completed"].append(message["data"])
+            if message["type"] == "tutor.step" and message["data"]["step_number"] not in taught:
+                taught.add(message["data"]["step_number"])
+                session["steps_completed"].append(message["data"])
+                sessions.set(session_id, session)
             
-            if message["type"] == "assessment.ready":
+            if message["type"] == "assessment.ready" and stored_assessment is None:
                 assessment_data = message["data"]["assessment"]
                 assessment_id = assessment_data["id"]
-                assessments[assessment_id] = assessment_data
-                sessions[session_id]["assessment"] = assessment_id
+                assessments.set(assessment_id, assessment_data)
+                session["assessment"] = assessment_id
+                session["assessments"].append(assessment_id)
+                sessions.set(session_id, session)
+                assessment_index.link(assessment_id, session_id, topic)
+                assessment_pool.register(topic, session["steps_completed"], session["difficulty"])
+            
+            if message["type"] == "tutor.complete":
+                session["completed"] = True
+                sessions.set(session_id, session)
+        
+        # Stay connected so results such as background grades can be pushed
+        # to this socket, from this worker or any other.
+        while True:
+            await websocket.receive_text()
         
     except WebSocketDisconnect:
-        if session_id in active_connections:
-            del active_connections[session_id]
+        pass
     except Exception as e:
         await websocket.send_json({
             "type": "error",
             "data": {"message": str(e)},
             "timestamp": datetime.now().isoformat()
         })
+    finally:
+        session_router.disconnect(session_id, websocket)
 
 
 @app.post("/api/assessments/{assessment_id}/submit")
-async def submit_assessment(assessment_id: str, submission: AssessmentSubmission):
-    if assessment_id not in assessments:
+async def submit_assessment(assessment_id: str, submission: AssessmentSubmission, background: bool = False):
+    assessment_data = assessments.get(assessment_id)
+    if assessment_data is None:
         raise HTTPException(status_code=404, detail="Assessment not found")
     
     if submission.assessment_id != assessment_id:
         raise HTTPException(status_code=400, detail="Assessment ID mismatch")
     
-    from app.models import Assessment
-    assessment = Assessment(**assessments[assessment_id])
-    grade_report = grader.grade_assessment(assessment, submission)
-    grade_reports[assessment_id] = grade_report.model_dump(mode='json')
+    key = grader.grading_key(assessment_data)
+    topic = assessment_data["topic"]
+    
+    try:
+        if background:
+            def on_graded(report: GradeReport) -> None:
+                finish_background_grade(submission, topic, report)
+            
+            def on_failed(error: str) -> None:
+                fail_background_grade(assessment_id, error)
+            
+            grading_executor.submit_background(key, submission, on_graded, on_failed)
+            return JSONResponse(status_code=202, content={
+                "assessment_id": assessment_id,
+                "status": "queued",
+                "message": f"Grading in progress. Poll /api/assessments/{assessment_id}/grade for the result.",
+                "submitted_at": submission.submitted_at.isoformat()
+            })
+        grade_report = await grading_executor.grade(key, submission)
+    except GradingQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    
+    report = store_grade(submission, topic, grade_report)
     
     return {
         "assessment_id": assessment_id,
-        "grade_report": grade_report.model_dump(mode='json'),
+        "grade_report": report,
+        "submitted_at": submission.submitted_at.isoformat()
+    }
+
+
+@app.post("/api/assessments/bulk-submit")
+async def bulk_submit_assessments(bulk: BulkSubmission):
+    count = len(bulk.submissions)
+    if count > grading_executor.max_queue_depth:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Bulk submission exceeds the grading queue ({grading_executor.max_queue_depth} submissions)"
+        )
+    try:
+        grading_executor.reserve(count)
+    except GradingQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    
+    topics: Dict[str, str] = {}
+    
+    def load_assessment(assessment_id: str):
+        assessment_data = assessments.get(assessment_id)
+        if assessment_data is not None:
+            topics[assessment_id] = assessment_data["topic"]
+        return assessment_data
+    
+    def results():
+        # Each submission holds a queue slot until it is graded; slots left
+        # over if the client disconnects are released at the end.
+        released = 0
+        try:
+            for index, (submission, grade_report) in enumerate(
+                grader.grade_many(bulk.submissions, load_assessment)
+            ):
+                grading_executor.release()
+                released += 1
+                yield json.dumps(_bulk_line(index, submission, grade_report, topics)) + "\n"
+        finally:
+            grading_executor.release(count - released)
+    
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+
+def _bulk_line(
+    index: int, submission: AssessmentSubmission, grade_report: Optional[GradeReport], topics: Dict[str, str]
+) -> Dict[str, Any]:
+    if grade_report is None:
+        return {
+            "index": index,
+            "assessment_id": submission.assessment_id,
+            "error": "Assessment not found"
+        }
+    report = store_grade(submission, topics[submission.assessment_id], grade_report, from_session=False)
+    return {
+        "index": index,
+        "assessment_id": submission.assessment_id,
+        "grade_report": report,
         "submitted_at": submission.submitted_at.isoformat()
     }
 
@@ -127,7 +458,25 @@ async def get_grade(assessment_id: str):
     if assessment_id not in assessments:
         raise HTTPException(status_code=404, detail="Assessment not found")
     
-    if assessment_id not in grade_reports:
+    if grading_executor.is_pending(assessment_id):
+        return {
+            "message": "Grading in progress, please check back shortly",
+            "assessment_id": assessment_id,
+            "has_grade": False,
+            "status": "pending"
+        }
+    
+    error = grading_executor.failure(assessment_id)
+    if error is not None:
+        return {
+            "message": f"Grading failed: {error}. Please submit your assessment again.",
+            "assessment_id": assessment_id,
+            "has_grade": False,
+            "status": "failed"
+        }
+    
+    grade_report = grade_reports.get(assessment_id)
+    if grade_report is None:
         return {
             "message": "Please submit your assessment first",
             "assessment_id": assessment_id,
@@ -136,62 +485,148 @@ async def get_grade(assessment_id: str):
     
     return {
         "assessment_id": assessment_id,
-        "grade_report": grade_reports[assessment_id],
+        "grade_report": grade_report,
         "has_grade": True
     }
 
 
+@app.get("/api/assessments/{assessment_id}/attempts")
+async def get_attempts(assessment_id: str, student_id: Optional[str] = None, limit: int = 100):
+    if assessment_id not in assessments:
+        raise HTTPException(status_code=404, detail="Assessment not found")
+    
+    response: Dict[str, Any] = {
+        "assessment_id": assessment_id,
+        "attempts": attempt_log.attempts(assessment_id, student_id, limit)
+    }
+    if student_id is not None:
+        response["best_attempt"] = attempt_log.best_attempt(assessment_id, student_id)
+    return response
+
+
+@app.get("/api/assessments/{assessment_id}/question-stats")
+async def get_question_stats(assessment_id: str):
+    if assessment_id not in assessments:
+        raise HTTPException(status_code=404, detail="Assessment not found")
+    return {"assessment_id": assessment_id, "questions": attempt_log.question_stats(assessment_id)}
+
+
 @app.post("/api/assessments/retake")
 async def retake_assessment(request: RetakeRequest):
-    if request.assessment_id not in assessments:
+    original_assessment = assessments.get(request.assessment_id)
+    if original_assessment is None:
         raise HTTPException(status_code=404, detail="Assessment not found")
     
-    original_assessment = assessments[request.assessment_id]
-    
-    teaching_steps = None
-    for session_data in sessions.values():
-        if session_data.get("assessment") == request.assessment_id:
-            teaching_steps = session_data.get("steps_completed", [])
-            break
+    teaching_steps = assessment_index.teaching_steps_for(request.assessment_id)
+    session_id = assessment_index.session_id_for(request.assessment_id)
+    session = (sessions.get(session_id) if session_id else None) or {}
+    difficulty = session.get("difficulty", "medium")
+    remediation_steps = [step["step_number"] for step in teaching_steps or []] or list(
+        range(1, session.get("total_steps", DEFAULT_LESSON_STEPS) + 1)
+    )
     
     if request.generate_new:
-        from app.models import AssessmentGenerationRequest
-        gen_request = AssessmentGenerationRequest(
-            topic=original_assessment["topic"],
-            question_count=5,
-            difficulty="medium",
-            teaching_steps=teaching_steps
+        # The pool is keyed by the session's canonical topic, which may be
+        # worded differently from the topic the lesson was taught under.
+        pool_topic = session.get("topic", original_assessment["topic"])
+        new_assessment = assessment_pool.pop(pool_topic, difficulty)
+        if new_assessment is None:
+            from app.models import AssessmentGenerationRequest
+            gen_request = AssessmentGenerationRequest(
+                topic=original_assessment["topic"],
+                question_count=assessment_pool.question_count,
+                difficulty=difficulty,
+                teaching_steps=teaching_steps
+            )
+            try:
+                new_assessment = await assessment_generator.generate_assessment(gen_request)
+            except AssessmentGenerationError as e:
+                raise HTTPException(status_code=502, detail=str(e))
+            assessment_pool.register(pool_topic, teaching_steps, difficulty)
+        assessments.set(new_assessment.id, new_assessment.model_dump(mode='json'))
+        assessment_index.link(
+            new_assessment.id,
+            assessment_index.session_id_for(request.assessment_id),
+            new_assessment.topic
         )
-        new_assessment = assessment_generator.generate_assessment(gen_request)
-        assessments[new_assessment.id] = new_assessment.model_dump(mode='json')
         
         return {
             "message": "New assessment generated",
             "original_assessment_id": request.assessment_id,
             "new_assessment_id": new_assessment.id,
             "assessment": new_assessment.model_dump(mode='json'),
-            "remediation_steps": [1, 2, 3, 4, 5]
+            "remediation_steps": remediation_steps
         }
     
     return {
         "message": "Retake with same assessment",
         "assessment_id": request.assessment_id,
         "assessment": original_assessment,
-        "remediation_steps": [1, 2, 3, 4, 5],
+        "remediation_steps": remediation_steps,
         "guidance": "Please review the teaching steps before retaking."
     }
 
 
 @app.get("/api/sessions/{session_id}")
 async def get_session(session_id: str):
-    if session_id not in sessions:
+    session = sessions.get(session_id)
+    if session is None:
         raise HTTPException(status_code=404, detail="Session not found")
-    return sessions[session_id]
+    return {**session, "connected": session_router.is_connected(session_id)}
 
 
 @app.get("/api/assessments/{assessment_id}")
 async def get_assessment(assessment_id: str):
-    if assessment_id not in assessments:
+    assessment = assessments.get(assessment_id)
+    if assessment is None:
         raise HTTPException(status_code=404, detail="Assessment not found")
-    return assessments[assessment_id]
+    return assessment
+
+
+@app.get("/api/topics/{topic}/assessments")
+async def get_topic_assessments(topic: str):
+    return {"topic": topic, "assessment_ids": assessment_index.assessments_for_topic(topic)}
+
+
+@app.get("/api/topics/{topic}/pass-rate")
+async def get_topic_pass_rate(topic: str):
+    return attempt_log.pass_rate(topic)
+
+
+@app.get("/api/grading/stats")
+async def get_grading_stats():
+    return grading_executor.stats()
+
+
+@app.get("/api/pool/stats")
+async def get_pool_stats():
+    return assessment_pool.stats()
+
+
+@app.get("/api/llm/stats")
+async def get_llm_stats():
+    return llm_gateway.stats
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    if not metrics.enabled:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/api/routing/stats")
+async def get_routing_stats():
+    return session_router.stats()
+
+
+@app.get("/api/lessons/stats")
+async def get_lesson_stats():
+    return lesson_flights.stats()
+
 
+@app.get("/api/topics/stats")
+async def get_topic_stats():
+    if topic_index is None:
+        raise HTTPException(status_code=404, detail="Topic index is disabled")
+    return topic_index.stats()
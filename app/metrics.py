@@ -0,0 +1,310 @@
+import os
+import time
+import asyncio
+import threading
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, TypeVar, cast
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+FAST_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+Labels = Tuple[str, ...]
+M = TypeVar("M", bound="_Metric")
+INF_LABEL = 'le="+Inf"'
+
+
+class _NullTimer:
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exc) -> None:
+        return None
+
+
+NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram: "Histogram", labels: Labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self) -> None:
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc) -> None:
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Labels, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, registry: "Metrics", name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.registry = registry
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+
+    def _export(self, value: float, labels: Labels) -> None:
+        for sink in self.registry.sinks:
+            sink.record(self.kind, self.name, value, dict(zip(self.labelnames, labels)))
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        registry: "Metrics",
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(registry, name, help_text, labelnames)
+        self.buckets = tuple(buckets)
+        self._series: Dict[Labels, List[Any]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        if not self.registry.enabled:
+            return
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = [[0] * (len(self.buckets) + 1), 0.0, 0]
+                self._series[labels] = series
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+        if self.registry.sinks:
+            self._export(value, labels)
+
+    def time(self, *labels: str):
+        if not self.registry.enabled:
+            return NULL_TIMER
+        return _Timer(self, labels)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            snapshot = [(labels, list(s[0]), s[1], s[2]) for labels, s in self._series.items()]
+        for labels, counts, total, count in snapshot:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = _format_labels(self.labelnames, labels, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, INF_LABEL)} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, registry: "Metrics", name: str, help_text: str, labelnames: Sequence[str] = ()):
+        super().__init__(registry, name, help_text, labelnames)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1.0, *labels: str) -> None:
+        if not self.registry.enabled or amount <= 0:
+            return
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+        if self.registry.sinks:
+            self._export(amount, labels)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            snapshot = list(self._values.items())
+        for labels, value in snapshot:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Gauge(_Metric):
+    """Gauge read at scrape time from a callback returning {labels: value}."""
+
+    kind = "gauge"
+
+    def __init__(
+        self,
+        registry: "Metrics",
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str] = (),
+        callback: Optional[Callable[[], Dict[Labels, float]]] = None
+    ):
+        super().__init__(registry, name, help_text, labelnames)
+        self.callback = callback
+        self._values: Dict[Labels, float] = {}
+
+    def set(self, value: float, *labels: str) -> None:
+        if self.registry.enabled:
+            self._values[labels] = value
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        values = dict(self._values)
+        if self.callback is not None:
+            try:
+                values.update(self.callback())
+            except Exception:
+                pass
+        for labels, value in values.items():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Metrics:
+    """In-process metrics registry rendered in the Prometheus text format.
+
+    When disabled every observe/inc is a single attribute check and timers
+    are a shared no-op context manager. Sinks (e.g. OpenTelemetry) receive a
+    copy of each observation.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.sinks: List[Any] = []
+        self._metrics: Dict[str, _Metric] = {}
+        self._loop_monitor: Optional[asyncio.Task] = None
+
+    def histogram(
+        self, name: str, help_text: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(self, name, help_text, labelnames, buckets))
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(self, name, help_text, labelnames))
+
+    def gauge(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str] = (),
+        callback: Optional[Callable[[], Dict[Labels, float]]] = None
+    ) -> Gauge:
+        return self._register(Gauge(self, name, help_text, labelnames, callback))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def start_loop_monitor(self, interval: float = 0.5) -> None:
+        if not self.enabled or (self._loop_monitor is not None and not self._loop_monitor.done()):
+            return
+        self._loop_monitor = asyncio.create_task(self._monitor_loop(interval))
+
+    async def _monitor_loop(self, interval: float) -> None:
+        # Lag is how late the loop wakes us past the requested sleep, i.e. how
+        # long something blocked it.
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + interval
+            await asyncio.sleep(interval)
+            LOOP_LAG_SECONDS.observe(max(loop.time() - expected, 0.0))
+
+    def _register(self, metric: M) -> M:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            # Each name is only ever registered as one kind of metric.
+            return cast(M, existing)
+        self._metrics[metric.name] = metric
+        return metric
+
+
+class OpenTelemetrySink:
+    """Mirrors observations to OpenTelemetry instruments exported over OTLP.
+
+    Needs the opentelemetry-sdk and opentelemetry-exporter-otlp packages; the
+    exporter reads OTEL_EXPORTER_OTLP_ENDPOINT and friends itself.
+    """
+
+    def __init__(self, meter_name: str = "langgraph-tutor"):
+        from opentelemetry.sdk.metrics import MeterProvider
+        from opentelemetry.sdk.metrics.export import PeriodicExportingMetricReader
+        from opentelemetry.exporter.otlp.proto.http.metric_exporter import OTLPMetricExporter
+
+        self.provider = MeterProvider(metric_readers=[PeriodicExportingMetricReader(OTLPMetricExporter())])
+        self.meter = self.provider.get_meter(meter_name)
+        self._instruments: Dict[str, Any] = {}
+
+    def record(self, kind: str, name: str, value: float, attributes: Dict[str, str]) -> None:
+        instrument = self._instruments.get(name)
+        if instrument is None:
+            if kind == "histogram":
+                instrument = self.meter.create_histogram(name, unit="s")
+            else:
+                instrument = self.meter.create_counter(name)
+            self._instruments[name] = instrument
+        if kind == "histogram":
+            instrument.record(value, attributes=attributes)
+        else:
+            instrument.add(value, attributes=attributes)
+
+
+def create_metrics() -> Metrics:
+    registry = Metrics(enabled=os.getenv("METRICS_ENABLED", "1").lower() not in ("0", "false", "no"))
+    if registry.enabled and os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT"):
+        registry.sinks.append(OpenTelemetrySink())
+    return registry
+
+
+metrics = create_metrics()
+
+NODE_SECONDS = metrics.histogram(
+    "tutor_graph_node_seconds", "Time spent in each LangGraph node", ("node",)
+)
+LLM_REQUEST_SECONDS = metrics.histogram(
+    "tutor_llm_request_seconds", "LLM request latency including retries", ("model", "mode")
+)
+LLM_FIRST_TOKEN_SECONDS = metrics.histogram(
+    "tutor_llm_first_token_seconds", "Time to the first streamed chunk", ("model",)
+)
+LLM_TOKENS = metrics.counter(
+    "tutor_llm_tokens_total", "Tokens reported by the LLM API", ("model", "direction")
+)
+LLM_RETRIES = metrics.counter(
+    "tutor_llm_retries_total", "LLM requests retried after a retryable error", ("model",)
+)
+ASSESSMENT_SECONDS = metrics.histogram(
+    "tutor_assessment_generation_seconds", "Time to generate assessment questions", ("kind",)
+)
+ASSESSMENT_PARSE_SECONDS = metrics.histogram(
+    "tutor_assessment_parse_seconds", "Time to parse and validate one LLM question batch", (), FAST_BUCKETS
+)
+GRADING_SECONDS = metrics.histogram(
+    "tutor_grading_seconds", "Time from queueing a submission to its grade report", ("pool",)
+)
+GRADE_COMPUTE_SECONDS = metrics.histogram(
+    "tutor_grade_compute_seconds", "Time spent in Grader.grade_with_key for one submission", (), FAST_BUCKETS
+)
+WEBSOCKET_SEND_SECONDS = metrics.histogram(
+    "tutor_websocket_send_seconds", "Time to send one WebSocket frame", ("type",), FAST_BUCKETS
+)
+LOOP_LAG_SECONDS = metrics.histogram(
+    "tutor_event_loop_lag_seconds", "How late the event loop ran a scheduled wakeup", (), FAST_BUCKETS
+)
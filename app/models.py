@@ -4,6 +4,9 @@ from datetime import datetime
 from enum import Enum
 
 
+Difficulty = Literal["easy", "medium", "hard"]
+
+
 class QuestionType(str, Enum):
     MCQ = "mcq"
     SHORT_ANSWER = "short_answer"
@@ -13,6 +16,7 @@ class QuestionType(str, Enum):
 class WebSocketMessageType(str, Enum):
     SESSION_START = "session.start"
     TUTOR_STEP = "tutor.step"
+    TUTOR_STEP_DELTA = "tutor.step.delta"
     TUTOR_COMPLETE = "tutor.complete"
     ASSESSMENT_READY = "assessment.ready"
     ERROR = "error"
@@ -50,9 +54,14 @@ class AnswerSubmission(BaseModel):
 class AssessmentSubmission(BaseModel):
     assessment_id: str
     answers: List[AnswerSubmission]
+    student_id: Optional[str] = None
     submitted_at: datetime = Field(default_factory=datetime.now)
 
 
+class BulkSubmission(BaseModel):
+    submissions: List[AssessmentSubmission] = Field(min_length=1, max_length=5000)
+
+
 class QuestionGrade(BaseModel):
     question_id: str
     score: float
@@ -84,6 +93,7 @@ class TutorStep(BaseModel):
     title: str
     content: str
     is_complete: bool = False
+    summary: Optional[str] = None
 
 
 class SessionState(BaseModel):
@@ -99,7 +109,7 @@ class SessionState(BaseModel):
 class AssessmentGenerationRequest(BaseModel):
     topic: str
     question_count: int = Field(default=5, ge=3, le=10)
-    difficulty: Literal["easy", "medium", "hard"] = "medium"
+    difficulty: Difficulty = "medium"
     question_types: Optional[List[QuestionType]] = None
     teaching_steps: Optional[List[Dict[str, Any]]] = None
 
@@ -0,0 +1,98 @@
+import os
+import uuid
+import asyncio
+from datetime import datetime
+from typing import Any, Dict, Optional, Set
+
+from app.broker import Broker
+from app.store import Store
+
+
+class SessionRouter:
+    """Delivers events to a session's WebSocket from any worker.
+
+    Each worker records the sessions it holds sockets for in a shared routes
+    store and listens on its own broker channel. send() writes straight to a
+    local socket, otherwise publishes to the owning worker's channel, so only
+    one channel per worker is needed no matter how many sessions are open.
+    """
+
+    def __init__(self, broker: Broker, routes: Store, worker_id: Optional[str] = None):
+        self.broker = broker
+        self.routes = routes
+        self.worker_id = worker_id or f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._sockets: Dict[str, Any] = {}
+        self._listener: Optional[asyncio.Task] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self.delivered_local = 0
+        self.delivered_remote = 0
+        self.undeliverable = 0
+
+    @property
+    def channel(self) -> str:
+        return f"worker:{self.worker_id}"
+
+    def connect(self, session_id: str, websocket: Any) -> None:
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+        self._sockets[session_id] = websocket
+        self.routes.set(session_id, {"worker_id": self.worker_id, "connected_at": datetime.now().isoformat()})
+
+    def disconnect(self, session_id: str, websocket: Any) -> None:
+        if self._sockets.get(session_id) is not websocket:
+            return
+        del self._sockets[session_id]
+        route = self.routes.get(session_id)
+        if route is not None and route.get("worker_id") == self.worker_id:
+            self.routes.delete(session_id)
+
+    def is_connected(self, session_id: str) -> bool:
+        return session_id in self._sockets or session_id in self.routes
+
+    async def send(self, session_id: str, event: Dict[str, Any]) -> bool:
+        if await self._deliver(session_id, event):
+            self.delivered_local += 1
+            return True
+        route = self.routes.get(session_id)
+        if route is None or route.get("worker_id") == self.worker_id:
+            self.undeliverable += 1
+            return False
+        await self.broker.publish(f"worker:{route['worker_id']}", {"session_id": session_id, "event": event})
+        self.delivered_remote += 1
+        return True
+
+    def send_soon(self, session_id: str, event: Dict[str, Any]) -> None:
+        # For sync callbacks (e.g. background grading) that cannot await send().
+        task = asyncio.create_task(self.send(session_id, event))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "worker_id": self.worker_id,
+            "local_sessions": len(self._sockets),
+            "delivered_local": self.delivered_local,
+            "delivered_remote": self.delivered_remote,
+            "undeliverable": self.undeliverable
+        }
+
+    async def close(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+        for session_id, websocket in list(self._sockets.items()):
+            self.disconnect(session_id, websocket)
+
+    async def _listen(self) -> None:
+        async for message in self.broker.subscribe(self.channel):
+            if not await self._deliver(message["session_id"], message["event"]):
+                self.undeliverable += 1
+
+    async def _deliver(self, session_id: str, event: Dict[str, Any]) -> bool:
+        websocket = self._sockets.get(session_id)
+        if websocket is None:
+            return False
+        try:
+            await websocket.send_json(event)
+        except Exception:
+            return False
+        return True
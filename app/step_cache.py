@@ -0,0 +1,163 @@
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, Tuple
+
+
+def normalize_topic(topic: str) -> str:
+    topic = re.sub(r"\s+", " ", topic.strip().lower())
+    return topic.strip(" .?!")
+
+
+def step_cache_key(
+    topic: str,
+    step_number: int,
+    model: str,
+    prompt_version: str,
+    total_steps: int = 5,
+    difficulty: str = "medium"
+) -> str:
+    raw = (
+        f"{normalize_topic(topic)}\x00{step_number}\x00{model}\x00{prompt_version}"
+        f"\x00{total_steps}\x00{difficulty}"
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class StepCache:
+    """Base class for teaching step caches. Subclasses implement _get/_set."""
+
+    def __init__(self, max_size: int = 10000, ttl_seconds: Optional[float] = None):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[str]:
+        value = self._get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key: str, content: str) -> None:
+        self._set(key, content)
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            "size": len(self)
+        }
+
+    def _expired(self, stored_at: float) -> bool:
+        return self.ttl_seconds is not None and time.time() - stored_at > self.ttl_seconds
+
+    def _get(self, key: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def _set(self, key: str, content: str) -> None:
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+
+class InMemoryStepCache(StepCache):
+    def __init__(self, max_size: int = 10000, ttl_seconds: Optional[float] = None):
+        super().__init__(max_size, ttl_seconds)
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            content, stored_at = entry
+            if self._expired(stored_at):
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return content
+
+    def _set(self, key: str, content: str) -> None:
+        with self._lock:
+            self._entries[key] = (content, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteStepCache(StepCache):
+    def __init__(self, path: str, max_size: int = 100000, ttl_seconds: Optional[float] = None):
+        super().__init__(max_size, ttl_seconds)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS step_cache ("
+            "key TEXT PRIMARY KEY, content TEXT NOT NULL, "
+            "stored_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS step_cache_accessed ON step_cache(accessed_at)")
+
+    def _get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content, stored_at FROM step_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            content, stored_at = row
+            if self._expired(stored_at):
+                self._conn.execute("DELETE FROM step_cache WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE step_cache SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            return content
+
+    def _set(self, key: str, content: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO step_cache (key, content, stored_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, content, now, now)
+            )
+            overflow = self._count() - self.max_size
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM step_cache WHERE key IN "
+                    "(SELECT key FROM step_cache ORDER BY accessed_at LIMIT ?)",
+                    (overflow,)
+                )
+
+    def _count(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM step_cache").fetchone()[0]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._count()
+
+
+def create_step_cache() -> Optional[StepCache]:
+    backend = os.getenv("STEP_CACHE_BACKEND", "memory").lower()
+    max_size = int(os.getenv("STEP_CACHE_MAX_SIZE", "10000"))
+    ttl = os.getenv("STEP_CACHE_TTL_SECONDS")
+    ttl_seconds = float(ttl) if ttl else None
+
+    if backend == "none":
+        return None
+    if backend == "sqlite":
+        path = os.getenv("STEP_CACHE_PATH", "step_cache.db")
+        return SQLiteStepCache(path, max_size=max_size, ttl_seconds=ttl_seconds)
+    return InMemoryStepCache(max_size=max_size, ttl_seconds=ttl_seconds)
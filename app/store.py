@@ -0,0 +1,230 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+EvictCallback = Callable[[str, Dict[str, Any]], None]
+
+
+class Store:
+    """Key/value store for sessions, assessments and grade reports.
+
+    Values are JSON-compatible dicts. Implementations may evict entries to stay
+    within max_size and ttl_seconds, so callers must handle get() returning None.
+    on_evict, when set, is called with the key and value of every entry the
+    store drops on its own (not for explicit delete()).
+    """
+
+    def __init__(self, max_size: Optional[int] = None, ttl_seconds: Optional[float] = None):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.on_evict: Optional[EvictCallback] = None
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def values(self) -> Iterator[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def _expired(self, stored_at: float) -> bool:
+        return self.ttl_seconds is not None and time.time() - stored_at > self.ttl_seconds
+
+    def _evicted(self, key: str, value: Dict[str, Any]) -> None:
+        if self.on_evict is not None:
+            self.on_evict(key, value)
+
+
+class InMemoryStore(Store):
+    def __init__(self, max_size: Optional[int] = 10000, ttl_seconds: Optional[float] = None):
+        super().__init__(max_size, ttl_seconds)
+        self._entries: "OrderedDict[str, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, stored_at = entry
+            if self._expired(stored_at):
+                del self._entries[key]
+                expired = True
+            else:
+                self._entries.move_to_end(key)
+                expired = False
+        if expired:
+            self._evicted(key, value)
+            return None
+        return value
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        evicted = []
+        with self._lock:
+            self._entries[key] = (value, time.time())
+            self._entries.move_to_end(key)
+            if self.max_size is not None:
+                while len(self._entries) > self.max_size:
+                    old_key, (old_value, _) = self._entries.popitem(last=False)
+                    evicted.append((old_key, old_value))
+        for old_key, old_value in evicted:
+            self._evicted(old_key, old_value)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def values(self) -> Iterator[Dict[str, Any]]:
+        with self._lock:
+            entries = list(self._entries.values())
+        for value, stored_at in entries:
+            if not self._expired(stored_at):
+                yield value
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteStore(Store):
+    # Counting rows is O(n) in SQLite, so max_size is enforced every N writes.
+    EVICT_CHECK_INTERVAL = 256
+
+    def __init__(
+        self,
+        path: str,
+        table: str,
+        max_size: Optional[int] = None,
+        ttl_seconds: Optional[float] = None
+    ):
+        super().__init__(max_size, ttl_seconds)
+        if not table.isidentifier():
+            raise ValueError(f"Invalid table name: {table}")
+        self.table = table
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL)"
+        )
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_stored_at ON {table}(stored_at)")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, stored_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, stored_at = row
+            expired = self._expired(stored_at)
+            if expired:
+                self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+        if expired:
+            self._evicted(key, json.loads(value))
+            return None
+        return json.loads(value)
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        evicted = []
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, stored_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), time.time())
+            )
+            self._writes += 1
+            if self.max_size is not None and self._writes % self.EVICT_CHECK_INTERVAL == 0:
+                overflow = self._count() - self.max_size
+                if overflow > 0:
+                    evicted = self._conn.execute(
+                        f"SELECT key, value FROM {self.table} ORDER BY stored_at LIMIT ?", (overflow,)
+                    ).fetchall()
+                    self._conn.executemany(
+                        f"DELETE FROM {self.table} WHERE key = ?", [(k,) for k, _ in evicted]
+                    )
+        for old_key, old_value in evicted:
+            self._evicted(old_key, json.loads(old_value))
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+
+    def values(self) -> Iterator[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(f"SELECT value, stored_at FROM {self.table}").fetchall()
+        for value, stored_at in rows:
+            if not self._expired(stored_at):
+                yield json.loads(value)
+
+    def _count(self) -> int:
+        return self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._count()
+
+
+class RedisStore(Store):
+    """Store backed by any client exposing the redis-py get/set/delete/scan_iter API."""
+
+    def __init__(self, client: Any, namespace: str, ttl_seconds: Optional[float] = None):
+        super().__init__(None, ttl_seconds)
+        self.client = client
+        self.prefix = f"tutor:{namespace}:"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        value = self.client.get(self.prefix + key)
+        if value is None:
+            return None
+        return json.loads(value)
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        ex = int(self.ttl_seconds) if self.ttl_seconds else None
+        self.client.set(self.prefix + key, json.dumps(value), ex=ex)
+
+    def delete(self, key: str) -> None:
+        self.client.delete(self.prefix + key)
+
+    def values(self) -> Iterator[Dict[str, Any]]:
+        for key in self.client.scan_iter(match=self.prefix + "*"):
+            value = self.client.get(key)
+            if value is not None:
+                yield json.loads(value)
+
+    def __contains__(self, key: str) -> bool:
+        return bool(self.client.exists(self.prefix + key))
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self.client.scan_iter(match=self.prefix + "*"))
+
+
+def create_store(namespace: str) -> Store:
+    backend = os.getenv("STORE_BACKEND", "memory").lower()
+    max_size = int(os.getenv("STORE_MAX_SIZE", "100000"))
+    ttl = os.getenv("STORE_TTL_SECONDS")
+    ttl_seconds = float(ttl) if ttl else None
+
+    if backend == "sqlite":
+        path = os.getenv("STORE_PATH", "tutor_store.db")
+        return SQLiteStore(path, namespace, max_size=max_size, ttl_seconds=ttl_seconds)
+    if backend == "redis":
+        import redis
+        client = redis.Redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+        return RedisStore(client, namespace, ttl_seconds=ttl_seconds)
+    return InMemoryStore(max_size=max_size, ttl_seconds=ttl_seconds)
@@ -0,0 +1,307 @@
+import os
+import re
+import json
+import zlib
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.step_cache import normalize_topic
+
+DIMENSIONS = 512
+DEFAULT_THRESHOLD = 0.3
+CANDIDATES = 16
+DEFAULT_MAX_TOPICS = 10000
+FLUSH_EVERY = 64
+WORD_WEIGHT = 2.0
+
+STOPWORDS = frozenset({
+    "a", "an", "the", "in", "of", "for", "to", "on", "with", "and", "about", "using",
+    "what", "whats", "is", "are", "how", "do", "does", "why", "when", "which",
+    "i", "me", "my", "can", "you", "please", "explain", "teach", "learn", "learning",
+    "understand", "understanding", "introduction", "intro", "basics", "tutorial", "guide",
+    "work", "works", "tell", "show", "overview"
+})
+
+_WORD_RE = re.compile(r"[a-z0-9+#]+")
+_VOWEL_RE = re.compile(r"[aeiouy]")
+
+
+def topic_terms(topic: str) -> List[str]:
+    # Words are kept as written: suffix stripping without a real stemmer
+    # merges different topics ("https" -> "http", "classes" -> "classe").
+    words = _WORD_RE.findall(normalize_topic(topic).replace("'", ""))
+    return [word for word in words if word not in STOPWORDS] or words
+
+
+def topic_key(topic: str) -> str:
+    """Order-insensitive key of a topic's words, e.g. "decorators python"."""
+    return " ".join(sorted(set(topic_terms(topic))))
+
+
+def terms_match(a: str, b: str) -> bool:
+    """Whether two topic words name the same thing: equal, plural or a typo.
+
+    Calibrated on the labelled pairs in tests/test_topic_index.py. Words with
+    digits must be equal ("python2" vs "python3"), and a word with no vowel
+    is an acronym whose "s" form is something else ("http" vs "https"). Typos
+    are one edit on words of six letters or more with the same first letter;
+    below nine letters that edit cannot be a substitution, which would turn
+    "insert" into "invert".
+    """
+    if a == b:
+        return True
+    if any(c.isdigit() for c in a + b):
+        return False
+    short, long = sorted((a, b), key=len)
+    if _VOWEL_RE.search(short) and (
+        long in (short + "s", short + "es") or (short.endswith("y") and long == short[:-1] + "ies")
+    ):
+        return True
+    if a[0] != b[0] or len(long) < 6:
+        return False
+    return _one_edit_apart(short, long, substitution=len(long) >= 9)
+
+
+def _one_edit_apart(short: str, long: str, substitution: bool) -> bool:
+    if len(short) == len(long):
+        diff = [i for i in range(len(short)) if short[i] != long[i]]
+        if len(diff) == 1:
+            return substitution
+        return (
+            len(diff) == 2 and diff[1] == diff[0] + 1
+            and short[diff[0]] == long[diff[1]] and short[diff[1]] == long[diff[0]]
+        )
+    if len(long) - len(short) != 1:
+        return False
+    i = next((i for i in range(len(short)) if short[i] != long[i]), len(short))
+    return short[i:] == long[i + 1:]
+
+
+def _terms_pair_up(left: List[str], right: List[str]) -> bool:
+    # Every word must match a different word on the other side.
+    if not left:
+        return not right
+    first, rest = left[0], left[1:]
+    return any(
+        terms_match(first, other) and _terms_pair_up(rest, right[:i] + right[i + 1:])
+        for i, other in enumerate(right)
+    )
+
+
+def embed_topic(topic: str, dimensions: int = DIMENSIONS) -> np.ndarray:
+    """Hash a topic's words and character trigrams into a unit vector.
+
+    Features are per word, so word order and stopwords do not matter
+    ("Decorators in Python" == "python decorators"), and trigrams keep
+    small spelling differences close to each other.
+    """
+    return _embed_terms(topic_terms(topic), dimensions)
+
+
+def _embed_terms(terms: List[str], dimensions: int) -> np.ndarray:
+    vector = np.zeros(dimensions, dtype=np.float32)
+    for word in terms:
+        padded = f"<{word}>"
+        features = [(f"w:{word}", WORD_WEIGHT)]
+        features.extend((f"g:{padded[i:i + 3]}", 1.0) for i in range(len(padded) - 2))
+        for feature, weight in features:
+            digest = zlib.crc32(feature.encode("utf-8"))
+            # The top bit picks a sign so hash collisions tend to cancel out.
+            vector[digest % dimensions] += -weight if digest & 0x80000000 else weight
+    norm = float(np.linalg.norm(vector))
+    if norm > 0:
+        vector /= norm
+    return vector
+
+
+class TopicIndex:
+    """Maps free-text topics onto the first equivalent topic seen.
+
+    resolve() returns a canonical topic for use as the cache key of lessons,
+    steps and assessments, so students asking for equivalent topics share
+    one lesson, worded as the first of them asked. Topics with the same
+    words in any order resolve to each other without a search. Otherwise
+    the CANDIDATES known topics with the same number of words and the
+    highest cosine similarity (at least threshold) are checked word by word
+    with terms_match, and the first whose words all pair up is used. Cosine
+    similarity scores "react hook"/"react hooks" no higher than
+    "http"/"https", so it only narrows the search. A topic that adds or
+    drops a word ("binary search tree" vs "binary search") is always a new
+    canonical topic.
+
+    Search is one brute-force matrix-vector product over all known topics,
+    which grows linearly (a few milliseconds at 10k topics), so resolve()
+    blocks and should run off the event loop. The index stops growing at
+    max_topics: later new topics resolve to themselves without being added,
+    and rephrasings are remembered for at most as many keys again.
+
+    With a path, new topics are appended to <path>.f32 (raw float32 rows)
+    and <path>.jsonl in batches of FLUSH_EVERY, or by flush(), and an
+    existing index is memory-mapped on startup instead of being read in or
+    re-embedded. Topics not yet flushed are lost on a crash and simply get
+    added again.
+    """
+
+    def __init__(
+        self,
+        threshold: float = DEFAULT_THRESHOLD,
+        path: Optional[str] = None,
+        dimensions: int = DIMENSIONS,
+        max_topics: int = DEFAULT_MAX_TOPICS
+    ):
+        self.threshold = threshold
+        self.path = path
+        self.dimensions = dimensions
+        self.max_topics = max_topics
+        self.topics: List[str] = []
+        self._aliases: Dict[str, int] = {}
+        self._vectors: np.ndarray = np.zeros((0, dimensions), dtype=np.float32)
+        self._sizes: np.ndarray = np.zeros(0, dtype=np.int32)
+        self._unflushed = 0
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.exact_hits = 0
+        self.similar_hits = 0
+        if path:
+            self._load()
+
+    def resolve(self, topic: str) -> str:
+        terms = sorted(set(topic_terms(topic)))
+        key = " ".join(terms)
+        with self._lock:
+            self.lookups += 1
+            index = self._aliases.get(key)
+            if index is not None:
+                self.exact_hits += 1
+                return self.topics[index]
+
+            vector = _embed_terms(terms, self.dimensions)
+            index = self._nearest(vector, terms)
+            if index is not None:
+                self.similar_hits += 1
+                if len(self._aliases) < 2 * self.max_topics:
+                    self._aliases[key] = index
+                return self.topics[index]
+
+            canonical = " ".join(topic.split())
+            if len(self.topics) < self.max_topics:
+                self._add(key, canonical, vector, len(terms))
+            return canonical
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush()
+
+    def stats(self) -> Dict[str, Any]:
+        hits = self.exact_hits + self.similar_hits
+        return {
+            "topics": len(self.topics),
+            "aliases": len(self._aliases) - len(self.topics),
+            "lookups": self.lookups,
+            "exact_hits": self.exact_hits,
+            "similar_hits": self.similar_hits,
+            "hit_rate": (hits / self.lookups) if self.lookups else 0.0,
+            "threshold": self.threshold,
+            "max_topics": self.max_topics
+        }
+
+    def __len__(self) -> int:
+        return len(self.topics)
+
+    def _nearest(self, vector: np.ndarray, terms: List[str]) -> Optional[int]:
+        count = len(self.topics)
+        if count == 0:
+            return None
+        scores = self._vectors[:count] @ vector
+        scores[self._sizes[:count] != len(terms)] = -1.0
+        top = min(CANDIDATES, count)
+        candidates = np.argpartition(-scores, top - 1)[:top]
+        for index in candidates[np.argsort(-scores[candidates])]:
+            if scores[index] < self.threshold:
+                break
+            if _terms_pair_up(terms, sorted(set(topic_terms(self.topics[index])))):
+                return int(index)
+        return None
+
+    def _add(self, key: str, canonical: str, vector: np.ndarray, size: int) -> None:
+        count = len(self.topics)
+        if count == len(self._vectors):
+            # Grows by doubling; this also swaps a read-only memory map for
+            # an in-memory copy on the first insert after loading.
+            grown = np.zeros((max(64, count * 2), self.dimensions), dtype=np.float32)
+            grown[:count] = self._vectors[:count]
+            self._vectors = grown
+            sizes = np.zeros(len(grown), dtype=np.int32)
+            sizes[:count] = self._sizes[:count]
+            self._sizes = sizes
+        self._vectors[count] = vector
+        self._sizes[count] = size
+        self.topics.append(canonical)
+        self._aliases[key] = count
+
+        if self.path:
+            self._unflushed += 1
+            if self._unflushed >= FLUSH_EVERY:
+                self._flush()
+
+    def _flush(self) -> None:
+        if not self.path or not self._unflushed:
+            return
+        end = len(self.topics)
+        start = end - self._unflushed
+        vectors_path, topics_path = self._files()
+        with open(vectors_path, "ab") as f:
+            f.write(self._vectors[start:end].tobytes())
+        with open(topics_path, "a", encoding="utf-8") as f:
+            f.writelines(json.dumps({"topic": topic}) + "\n" for topic in self.topics[start:end])
+        self._unflushed = 0
+
+    def _files(self) -> Tuple[str, str]:
+        return f"{self.path}.f32", f"{self.path}.jsonl"
+
+    def _load(self) -> None:
+        vectors_path, topics_path = self._files()
+        if not (os.path.exists(vectors_path) and os.path.exists(topics_path)):
+            return
+
+        topics = []
+        with open(topics_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    topics.append(json.loads(line)["topic"])
+                except (ValueError, KeyError):
+                    break
+
+        # A crash between the two appends leaves one file a row ahead; cut
+        # both back to the rows they have in common.
+        row_bytes = self.dimensions * 4
+        rows = min(len(topics), os.path.getsize(vectors_path) // row_bytes)
+        if os.path.getsize(vectors_path) != rows * row_bytes:
+            os.truncate(vectors_path, rows * row_bytes)
+        if len(topics) != rows:
+            topics = topics[:rows]
+            with open(topics_path, "w", encoding="utf-8") as f:
+                f.writelines(json.dumps({"topic": topic}) + "\n" for topic in topics)
+        if rows == 0:
+            return
+
+        # An index saved with a higher max_topics only loads up to the cap.
+        topics = topics[:self.max_topics]
+        self._vectors = np.memmap(vectors_path, dtype=np.float32, mode="r", shape=(len(topics), self.dimensions))
+        self._sizes = np.array([len(set(topic_terms(topic))) for topic in topics], dtype=np.int32)
+        self.topics = topics
+        self._aliases = {topic_key(topic): i for i, topic in enumerate(topics)}
+
+
+def create_topic_index() -> Optional[TopicIndex]:
+    backend = os.getenv("TOPIC_INDEX_BACKEND", "memory").lower()
+    threshold = float(os.getenv("TOPIC_MATCH_THRESHOLD", str(DEFAULT_THRESHOLD)))
+    max_topics = int(os.getenv("TOPIC_INDEX_MAX_TOPICS", str(DEFAULT_MAX_TOPICS)))
+
+    if backend == "none":
+        return None
+    if backend == "file":
+        return TopicIndex(threshold, path=os.getenv("TOPIC_INDEX_PATH", "topic_index"), max_topics=max_topics)
+    return TopicIndex(threshold, max_topics=max_topics)
@@ -0,0 +1,246 @@
+"""End-to-end load test of the real FastAPI app against a fake LLM.
+
+Starts app.main under uvicorn in this process, with the tutor agent and the
+assessment generator switched to FakeChatModel (routed through the real LLM
+gateway). Then drives N WebSocket lessons, each followed by a submission and,
+for a share of them, a retake. Reports p50/p99 latencies, sessions/s and
+memory, and can save the results or compare them with a saved baseline:
+
+    python -m benchmarks.bench_app --sessions 200 --concurrency 50 --output baseline.json
+    # ...make a change...
+    python -m benchmarks.bench_app --sessions 200 --concurrency 50 --baseline baseline.json
+
+Runs are seeded (--seed), so the fake's latencies and malformed answers
+repeat from run to run; only scheduling order varies. The client shares the
+process and event loop with the server, so compare runs on the same machine.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import socket
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.fake_llm import FakeChatModel
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class Recorder:
+    def __init__(self):
+        self.timings: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+
+    def add(self, name: str, seconds: float) -> None:
+        self.timings.setdefault(name, []).append(seconds)
+
+    def error(self, name: str) -> None:
+        self.errors[name] = self.errors.get(name, 0) + 1
+
+
+async def run_session(client: Any, base_url: str, index: int, args: argparse.Namespace, recorder: Recorder) -> None:
+    rng = random.Random(args.seed * 100003 + index)
+    session_id = f"bench-{index}"
+    ws_url = base_url.replace("http", "ws", 1) + f"/ws/{session_id}"
+
+    start = time.perf_counter()
+    assessment: Optional[Dict[str, Any]] = None
+    try:
+        async with client.ws_connect(ws_url) as ws:
+            await ws.receive_json()
+            await ws.send_json({
+                "topic": f"Benchmark topic {index % args.topics}",
+                "steps": args.steps,
+                "stream": args.stream,
+                "parallel": args.parallel,
+                "pipeline_assessment": args.pipeline
+            })
+            first_step = None
+            while True:
+                message = await ws.receive_json()
+                if message["type"] == "tutor.step" and first_step is None:
+                    first_step = time.perf_counter() - start
+                    recorder.add("first_step", first_step)
+                elif message["type"] == "assessment.ready":
+                    assessment = message["data"]["assessment"]
+                elif message["type"] == "tutor.complete":
+                    break
+                elif message["type"] == "error":
+                    raise RuntimeError(message["data"]["message"])
+        recorder.add("lesson", time.perf_counter() - start)
+    except Exception:
+        recorder.error("lesson")
+        return
+
+    if assessment is None:
+        recorder.error("assessment")
+        return
+
+    answers = [
+        {"question_id": q["id"], "answer": rng.choice(q.get("options") or [""])}
+        for q in assessment["questions"]
+    ]
+    started = time.perf_counter()
+    async with client.post(
+        f"{base_url}/api/assessments/{assessment['id']}/submit",
+        json={"assessment_id": assessment["id"], "answers": answers, "student_id": session_id}
+    ) as response:
+        await response.read()
+        if response.status == 200:
+            recorder.add("submit", time.perf_counter() - started)
+        else:
+            recorder.error("submit")
+
+    if rng.random() < args.retake_ratio:
+        started = time.perf_counter()
+        async with client.post(
+            f"{base_url}/api/assessments/retake",
+            json={"assessment_id": assessment["id"], "generate_new": True}
+        ) as response:
+            await response.read()
+            if response.status == 200:
+                recorder.add("retake", time.perf_counter() - started)
+            else:
+                recorder.error("retake")
+
+
+def install_fakes(args: argparse.Namespace) -> List[FakeChatModel]:
+    from app import main
+
+    fakes = [
+        FakeChatModel(
+            latency=args.latency,
+            distribution=args.distribution,
+            jitter=args.jitter,
+            tokens_per_second=args.tokens_per_second,
+            malformed_rate=args.malformed_rate,
+            seed=args.seed + offset
+        )
+        for offset in range(2)
+    ]
+    main.tutor_agent.llm = main.llm_gateway.wrap(fakes[0], "gpt-4", 0.7)
+    main.assessment_generator.llm = main.llm_gateway.wrap(fakes[1], "gpt-4", 0.9)
+    return fakes
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    import aiohttp
+    import uvicorn
+
+    # Must be set before app.main is imported by install_fakes; the key only
+    # lets the real ChatOpenAI clients be built, they are swapped for fakes.
+    os.environ.setdefault("STEP_CACHE_BACKEND", args.step_cache)
+    os.environ.setdefault("OPENAI_API_KEY", "sk-fake")
+    fakes = install_fakes(args)
+    from app.main import app
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", ws_max_size=2 ** 24))
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    base_url = f"http://127.0.0.1:{port}"
+    recorder = Recorder()
+    slots = asyncio.Semaphore(args.concurrency)
+    rss_before = rss_mb()
+
+    async def bounded(client: Any, index: int) -> None:
+        async with slots:
+            await run_session(client, base_url, index, args, recorder)
+
+    connector = aiohttp.TCPConnector(limit=args.concurrency * 2)
+    async with aiohttp.ClientSession(connector=connector) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(bounded(client, i) for i in range(args.sessions)))
+        elapsed = time.perf_counter() - start
+
+    server.should_exit = True
+    await server_task
+
+    results: Dict[str, Any] = {
+        "sessions": args.sessions,
+        "completed": len(recorder.timings.get("lesson", [])),
+        "wall_seconds": elapsed,
+        "sessions_per_second": len(recorder.timings.get("lesson", [])) / elapsed,
+        "llm_calls": sum(f.calls for f in fakes),
+        "malformed_batches": sum(f.malformed for f in fakes),
+        "rss_mb": rss_mb(),
+        "rss_growth_mb": rss_mb() - rss_before,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "errors": recorder.errors
+    }
+    for name, values in recorder.timings.items():
+        results[f"{name}_p50"] = percentile(values, 0.50)
+        results[f"{name}_p99"] = percentile(values, 0.99)
+    return results
+
+
+def report(results: Dict[str, Any], baseline: Optional[Dict[str, Any]]) -> None:
+    for key, value in results.items():
+        line = f"{key:<22} {value:.4f}" if isinstance(value, float) else f"{key:<22} {value}"
+        previous = (baseline or {}).get(key)
+        if isinstance(value, (int, float)) and isinstance(previous, (int, float)) and previous:
+            line += f"   ({(value - previous) / previous * 100:+.1f}% vs baseline {previous:.4f})"
+        print(line)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--topics", type=int, default=10, help="Distinct topics shared by the sessions")
+    parser.add_argument("--steps", type=int, default=5)
+    parser.add_argument("--stream", action="store_true")
+    parser.add_argument("--parallel", action="store_true")
+    parser.add_argument("--pipeline", action="store_true")
+    parser.add_argument("--retake-ratio", type=float, default=0.3)
+    parser.add_argument("--latency", type=float, default=0.2, help="Median time to first token")
+    parser.add_argument("--distribution", choices=["fixed", "uniform", "lognormal"], default="lognormal")
+    parser.add_argument("--jitter", type=float, default=0.3)
+    parser.add_argument("--tokens-per-second", type=float, default=400.0)
+    parser.add_argument("--malformed-rate", type=float, default=0.05)
+    parser.add_argument("--step-cache", default="none", help="STEP_CACHE_BACKEND for the run")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Write results as JSON, e.g. to use as a baseline")
+    parser.add_argument("--baseline", help="Compare with results saved by --output")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    baseline = json.loads(Path(args.baseline).read_text()) if args.baseline else None
+    report(results, baseline)
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
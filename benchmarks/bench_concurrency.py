@@ -0,0 +1,55 @@
+"""Run N lessons concurrently against a fake LLM and report wall time.
+
+With async graph nodes, wall time should stay close to a single lesson's
+latency (6 LLM calls) as N grows, instead of scaling linearly.
+
+    python -m benchmarks.bench_concurrency --sessions 1 10 100 500 --latency 0.2
+
+Pass --parallel to generate each lesson's steps concurrently, which should
+bring a single lesson down from ~6 to ~2 LLM latencies.
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.agent import TutorAgent
+from app.assessment_generator import AssessmentGenerator
+from benchmarks.fake_llm import FakeChatModel
+
+
+async def run_lesson(agent: TutorAgent, index: int, parallel: bool) -> int:
+    events = 0
+    async for _ in agent.stream_teaching("Python decorators", f"bench-{index}", parallel=parallel):
+        events += 1
+    return events
+
+
+async def run(sessions: int, latency: float, parallel: bool) -> None:
+    llm = FakeChatModel(latency=latency)
+    agent = TutorAgent(llm=llm, assessment_generator=AssessmentGenerator(llm=llm))
+    
+    start = time.perf_counter()
+    await asyncio.gather(*(run_lesson(agent, i, parallel) for i in range(sessions)))
+    elapsed = time.perf_counter() - start
+    
+    print(f"sessions={sessions:<5} llm_calls={llm.calls:<6} wall={elapsed:.2f}s "
+          f"sessions/s={sessions / elapsed:.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 10, 100, 500])
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--parallel", action="store_true")
+    args = parser.parse_args()
+    
+    for n in args.sessions:
+        asyncio.run(run(n, args.latency, args.parallel))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Drive the LLM gateway against a local fake chat-completions server.
+
+Fires a burst of requests with a share of them rejected as 429 and reports
+how many completed, how many retries it took, the peak concurrency the server
+saw, and how many duplicate prompts were coalesced.
+
+    python -m benchmarks.bench_gateway --requests 200 --max-concurrency 16 --rate-limit-ratio 0.2
+
+Compare with --max-retries 0 to see the failures the gateway absorbs.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from langchain_core.messages import HumanMessage
+
+from app.llm_gateway import LLMGateway
+from benchmarks.fake_openai_server import FakeOpenAIServer
+
+
+async def run(args: argparse.Namespace) -> None:
+    server = FakeOpenAIServer(latency=args.latency, rate_limit_ratio=args.rate_limit_ratio)
+    await server.start()
+    os.environ["OPENAI_BASE_URL"] = server.base_url
+    os.environ.setdefault("OPENAI_API_KEY", "sk-fake")
+
+    gateway = LLMGateway(
+        max_concurrency=args.max_concurrency,
+        rate_per_second=args.rate,
+        max_retries=args.max_retries,
+        base_delay=0.05,
+        max_delay=1.0
+    )
+    llm = gateway.chat_model("gpt-4", temperature=0.7)
+
+    async def call(index: int) -> bool:
+        prompt = f"Explain topic {index % args.distinct}"
+        try:
+            if index % 2 and args.stream:
+                async for _ in llm.astream([HumanMessage(content=prompt)]):
+                    pass
+            else:
+                await llm.ainvoke([HumanMessage(content=prompt)])
+            return True
+        except Exception:
+            return False
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(call(i) for i in range(args.requests)))
+    elapsed = time.perf_counter() - start
+    await gateway.aclose()
+    await server.stop()
+
+    print(f"requests={args.requests} ok={sum(results)} failed={results.count(False)} wall={elapsed:.2f}s")
+    print(f"server: requests={server.requests} rate_limited={server.rate_limited} "
+          f"peak_concurrent={server.peak_concurrent}")
+    print(f"gateway: {gateway.stats}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--distinct", type=int, default=150, help="Distinct prompts; the rest are duplicates")
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--rate-limit-ratio", type=float, default=0.2)
+    parser.add_argument("--max-concurrency", type=int, default=16)
+    parser.add_argument("--rate", type=float, default=0.0, help="Token-bucket rate per second (0 disables)")
+    parser.add_argument("--max-retries", type=int, default=4)
+    parser.add_argument("--stream", action="store_true", help="Send every other request with astream")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
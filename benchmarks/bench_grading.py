@@ -0,0 +1,82 @@
+"""Compare the two submit paths: rebuilding Assessment(**stored) per submission
+versus grading against a cached GradingKey, then report bulk throughput of
+Grader.grade_many in submissions graded per second.
+
+    python -m benchmarks.bench_grading --submissions 10000 --questions 10
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.grader import Grader
+from app.models import Assessment, AssessmentSubmission, AnswerSubmission, Question, QuestionType
+
+
+def make_assessment(question_count: int) -> dict:
+    questions = [
+        Question(
+            id=f"q_{i + 1}",
+            type=QuestionType.MCQ,
+            question=f"Which statement about decorators is true ({i})?",
+            options=["Alpha", "Beta", "Gamma", "Delta"],
+            expected_answer="Alpha",
+            points=10
+        )
+        for i in range(question_count)
+    ]
+    assessment = Assessment(
+        id="bench-assessment",
+        topic="Python decorators",
+        questions=questions,
+        total_points=10 * question_count
+    )
+    return assessment.model_dump(mode="json")
+
+
+def make_submission(question_count: int) -> AssessmentSubmission:
+    return AssessmentSubmission(
+        assessment_id="bench-assessment",
+        answers=[
+            AnswerSubmission(question_id=f"q_{i + 1}", answer="Alpha" if i % 2 else "Beta")
+            for i in range(question_count)
+        ]
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--submissions", type=int, default=10000)
+    parser.add_argument("--questions", type=int, default=10)
+    args = parser.parse_args()
+    
+    stored = make_assessment(args.questions)
+    submission = make_submission(args.questions)
+    grader = Grader()
+    
+    start = time.perf_counter()
+    for _ in range(args.submissions):
+        grader.grade_assessment(Assessment(**stored), submission)
+    rebuild = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    for _ in range(args.submissions):
+        grader.grade_with_key(grader.grading_key(stored), submission)
+    cached = time.perf_counter() - start
+    
+    print(f"rebuild model: {rebuild / args.submissions * 1e6:8.1f}us/submission")
+    print(f"cached key:    {cached / args.submissions * 1e6:8.1f}us/submission  "
+          f"({rebuild / cached:.1f}x faster)")
+    
+    batch = [submission] * args.submissions
+    start = time.perf_counter()
+    for _ in grader.grade_many(batch, lambda _: stored):
+        pass
+    bulk = time.perf_counter() - start
+    print(f"grade_many:    {args.submissions / bulk:8.0f} submissions/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Short-answer keyword matching: per-keyword substring scans versus a
+KeywordMatcher compiled once and reused across submissions.
+
+    python -m benchmarks.bench_keywords --keywords 500 --answer-words 5000
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.keyword_matcher import KeywordMatcher
+
+VOCABULARY = [
+    "function", "decorator", "closure", "wrapper", "argument", "return", "value", "scope",
+    "callable", "object", "class", "method", "attribute", "syntax", "python", "module",
+    "import", "lambda", "iterator", "generator", "context", "manager", "exception", "error"
+]
+
+
+def naive_count(keywords: list, answer: str) -> int:
+    answer_lower = answer.lower()
+    return sum(1 for keyword in [k.lower() for k in keywords] if keyword in answer_lower)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--keywords", type=int, default=500)
+    parser.add_argument("--answer-words", type=int, default=5000)
+    parser.add_argument("--submissions", type=int, default=200)
+    args = parser.parse_args()
+    
+    rng = random.Random(0)
+    keywords = [
+        " ".join(rng.choice(VOCABULARY) + str(rng.randint(0, 50)) for _ in range(rng.randint(1, 3)))
+        for _ in range(args.keywords)
+    ]
+    answers = [
+        " ".join(rng.choice(VOCABULARY) + str(rng.randint(0, 50)) for _ in range(args.answer_words))
+        for _ in range(args.submissions)
+    ]
+    
+    start = time.perf_counter()
+    for answer in answers:
+        naive_count(keywords, answer)
+    naive = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    matcher = KeywordMatcher(keywords)
+    compile_time = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    for answer in answers:
+        matcher.count(answer)
+    compiled = time.perf_counter() - start
+    
+    print(f"keywords={args.keywords} answer_words={args.answer_words} submissions={args.submissions}")
+    print(f"substring scan:   {naive / args.submissions * 1e3:8.2f}ms/answer")
+    print(f"KeywordMatcher:   {compiled / args.submissions * 1e3:8.2f}ms/answer "
+          f"(compiled once in {compile_time * 1e3:.2f}ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Simulate several workers sharing a broker and measure event delivery.
+
+Each "worker" is a SessionRouter on one shared InProcessBroker and routes
+store, holding fake sockets for its share of the sessions. Events are sent
+from random workers, so most of them are routed to another worker.
+
+    python -m benchmarks.bench_routing --workers 4 --sessions 1000 --events 20000
+
+Reports delivered events, how many crossed workers, and throughput.
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.broker import InProcessBroker
+from app.session_router import SessionRouter
+from app.store import InMemoryStore
+
+
+class FakeSocket:
+    def __init__(self):
+        self.received = 0
+
+    async def send_json(self, data: dict) -> None:
+        self.received += 1
+
+
+async def run(workers: int, sessions: int, events: int) -> None:
+    broker = InProcessBroker()
+    routes = InMemoryStore(max_size=None)
+    routers = [SessionRouter(broker, routes, worker_id=f"w{i}") for i in range(workers)]
+    sockets = {}
+    for index in range(sessions):
+        session_id = f"session-{index}"
+        sockets[session_id] = FakeSocket()
+        routers[index % workers].connect(session_id, sockets[session_id])
+    await asyncio.sleep(0)
+
+    session_ids = list(sockets)
+    start = time.perf_counter()
+    for _ in range(events):
+        await random.choice(routers).send(random.choice(session_ids), {"type": "grading.complete", "data": {}})
+    while sum(s.received for s in sockets.values()) < events:
+        await asyncio.sleep(0)
+    elapsed = time.perf_counter() - start
+
+    remote = sum(r.delivered_remote for r in routers)
+    print(f"workers={workers} sessions={sessions} events={events} remote={remote} "
+          f"wall={elapsed:.2f}s events/s={events / elapsed:.0f}")
+    for router in routers:
+        await router.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--events", type=int, default=20000)
+    args = parser.parse_args()
+    asyncio.run(run(args.workers, args.sessions, args.events))
+
+
+if __name__ == "__main__":
+    main()
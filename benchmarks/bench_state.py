@@ -0,0 +1,106 @@
+"""Measure per-step graph state overhead as lessons grow.
+
+Builds a loop graph shaped like the tutor's teach_step node and runs it for N
+steps twice: once with nodes returning the whole state with a copied message
+list (the old pattern), once with nodes returning only their delta and
+letting reducers append. Reports time per step and peak traced memory.
+
+    python -m benchmarks.bench_state --steps 5 50 200 500
+"""
+import argparse
+import asyncio
+import operator
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Annotated, TypedDict
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from langgraph.graph import StateGraph, END
+from langgraph.graph.message import add_messages
+
+CONTENT = "Fake teaching content. " * 40
+
+
+class CopyState(TypedDict):
+    messages: Annotated[list, add_messages]
+    current_step: int
+    steps_completed: list
+    total_steps: int
+
+
+class DeltaState(TypedDict):
+    messages: Annotated[list, add_messages]
+    current_step: int
+    steps_completed: Annotated[list, operator.add]
+    total_steps: int
+
+
+def copy_node(state: CopyState) -> CopyState:
+    step_number = state["current_step"] + 1
+    steps_completed = state.get("steps_completed", [])
+    steps_completed.append({"step_number": step_number, "content": CONTENT})
+    return {
+        **state,
+        "current_step": step_number,
+        "steps_completed": steps_completed,
+        "messages": state.get("messages", []) + [
+            {"role": "assistant", "content": CONTENT, "step": step_number}
+        ]
+    }
+
+
+def delta_node(state: DeltaState) -> dict:
+    step_number = state["current_step"] + 1
+    return {
+        "current_step": step_number,
+        "steps_completed": [{"step_number": step_number, "content": CONTENT}],
+        "messages": [{"role": "assistant", "content": CONTENT, "step": step_number}]
+    }
+
+
+def build(state_type, node):
+    workflow = StateGraph(state_type)
+    workflow.add_node("teach_step", node)
+    workflow.set_entry_point("teach_step")
+    workflow.add_conditional_edges(
+        "teach_step",
+        lambda s: "continue" if s["current_step"] < s["total_steps"] else "done",
+        {"continue": "teach_step", "done": END}
+    )
+    return workflow.compile()
+
+
+async def measure(graph, steps: int) -> tuple:
+    initial = {"messages": [], "current_step": 0, "steps_completed": [], "total_steps": steps}
+    config = {"recursion_limit": steps + 10}
+    tracemalloc.start()
+    start = time.perf_counter()
+    async for _ in graph.astream(initial, config):
+        pass
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+async def run(step_counts: list) -> None:
+    graphs = {"copy": build(CopyState, copy_node), "delta": build(DeltaState, delta_node)}
+    for steps in step_counts:
+        for name, graph in graphs.items():
+            elapsed, peak = await measure(graph, steps)
+            print(f"steps={steps:<5} nodes={name:<6} per_step={elapsed / steps * 1000:.3f}ms "
+                  f"peak_mem={peak / 1024:.0f}KiB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--steps", type=int, nargs="+", default=[5, 50, 200, 500])
+    args = parser.parse_args()
+    asyncio.run(run(args.steps))
+
+
+if __name__ == "__main__":
+    main()
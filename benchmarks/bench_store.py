@@ -0,0 +1,93 @@
+"""Write and read N assessments through each Store backend.
+
+Reports per-operation latency (mean/p99) and memory: traced Python heap for
+the in-memory stores, file size for SQLite.
+
+    python -m benchmarks.bench_store --count 100000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.store import InMemoryStore, RedisStore, SQLiteStore, Store
+from benchmarks.fake_redis import FakeRedis
+
+
+def make_assessment() -> dict:
+    return {
+        "id": str(uuid.uuid4()),
+        "topic": "Python decorators",
+        "questions": [
+            {
+                "id": f"q_{i + 1}",
+                "type": "mcq",
+                "question": f"Which statement about decorators is true ({i})?",
+                "options": ["Alpha", "Beta", "Gamma", "Delta"],
+                "expected_answer": "Alpha",
+                "points": 10
+            }
+            for i in range(5)
+        ],
+        "total_points": 50,
+        "pass_threshold": 0.7,
+        "created_at": "2024-12-02T15:40:35"
+    }
+
+
+def percentile(samples: list, fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def bench(name: str, store: Store, count: int, memory: str = "heap") -> None:
+    items = [make_assessment() for _ in range(count)]
+    
+    if memory == "heap":
+        tracemalloc.start()
+    write_times = []
+    for item in items:
+        start = time.perf_counter()
+        store.set(item["id"], item)
+        write_times.append(time.perf_counter() - start)
+    if memory == "heap":
+        used = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        memory_text = f"heap={used / 1e6:.1f}MB"
+    else:
+        memory_text = f"disk={os.path.getsize(memory) / 1e6:.1f}MB"
+    
+    keys = [item["id"] for item in random.sample(items, min(count, 10000))]
+    read_times = []
+    for key in keys:
+        start = time.perf_counter()
+        store.get(key)
+        read_times.append(time.perf_counter() - start)
+    
+    print(f"{name:<10} n={count} "
+          f"set mean={sum(write_times) / len(write_times) * 1e6:.1f}us p99={percentile(write_times, 0.99) * 1e6:.1f}us  "
+          f"get mean={sum(read_times) / len(read_times) * 1e6:.1f}us p99={percentile(read_times, 0.99) * 1e6:.1f}us  "
+          f"{memory_text}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=100000)
+    args = parser.parse_args()
+    
+    bench("memory", InMemoryStore(max_size=None), args.count)
+    bench("redis-fake", RedisStore(FakeRedis(), "assessments"), args.count)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        bench("sqlite", SQLiteStore(path, "assessments"), args.count, memory=path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Topic index: resolve() latency as the number of known topics grows, and
+startup time when an index file is memory-mapped.
+
+    python -m benchmarks.bench_topics --topics 10000 --lookups 2000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.topic_index import TopicIndex
+
+SUBJECTS = [
+    "python", "javascript", "rust", "go", "java", "sql", "css", "react", "docker", "linux",
+    "kubernetes", "git", "bash", "typescript", "haskell", "c++", "django", "pandas", "numpy", "redis"
+]
+CONCEPTS = [
+    "decorators", "closures", "generators", "iterators", "classes", "inheritance", "recursion",
+    "lists", "dictionaries", "sets", "tuples", "async", "threads", "processes", "indexes",
+    "joins", "transactions", "hooks", "components", "ownership", "lifetimes", "traits",
+    "interfaces", "modules", "packages", "exceptions", "testing", "logging", "pointers", "macros"
+]
+PHRASINGS = ["{s} {c}", "{c} in {s}", "what are {s} {c}", "explain {c} in {s}", "intro to {s} {c}"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--topics", type=int, default=10000)
+    parser.add_argument("--lookups", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "topics")
+        index = TopicIndex(path=path, max_topics=args.topics)
+
+        start = time.perf_counter()
+        for i in range(args.topics):
+            index.resolve(f"{rng.choice(SUBJECTS)} {rng.choice(CONCEPTS)} {i}")
+        build = time.perf_counter() - start
+
+        queries = [
+            rng.choice(PHRASINGS).format(s=rng.choice(SUBJECTS), c=rng.choice(CONCEPTS)) + f" {rng.randrange(args.topics)}"
+            for _ in range(args.lookups)
+        ]
+        start = time.perf_counter()
+        for query in queries:
+            index.resolve(query)
+        lookup = time.perf_counter() - start
+        index.flush()
+
+        start = time.perf_counter()
+        loaded = TopicIndex(path=path, max_topics=args.topics)
+        load = time.perf_counter() - start
+
+        print(f"topics={len(index)} lookups={args.lookups}")
+        print(f"build:   {build / args.topics * 1e6:8.1f}us/topic (embed, search, append to disk)")
+        print(f"resolve: {lookup / args.lookups * 1e6:8.1f}us/lookup")
+        print(f"load:    {load * 1e3:8.1f}ms for {len(loaded)} topics (memory-mapped)")
+        print(f"stats:   {index.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import re
+import json
+import random
+import asyncio
+from typing import Any, List, Optional
+
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+_COUNT_RE = re.compile(r"Generate (\d+) multiple choice")
+
+
+class FakeChatModel:
+    """Stand-in for ChatOpenAI that sleeps instead of calling the API.
+
+    latency is the time to first token. With distribution "uniform" it is
+    drawn from latency +/- jitter, with "lognormal" from a lognormal whose
+    median is latency and sigma is jitter. tokens_per_second, when set, also
+    paces ainvoke by the length of the answer, like a real completion.
+    malformed_rate is the share of question batches returned as broken JSON.
+    A seed makes the sequence of latencies and failures reproducible.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.5,
+        token_delay: float = 0.005,
+        distribution: str = "fixed",
+        jitter: float = 0.0,
+        tokens_per_second: Optional[float] = None,
+        malformed_rate: float = 0.0,
+        seed: Optional[int] = None
+    ):
+        self.latency = latency
+        self.token_delay = (1.0 / tokens_per_second) if tokens_per_second else token_delay
+        self.distribution = distribution
+        self.jitter = jitter
+        self.tokens_per_second = tokens_per_second
+        self.malformed_rate = malformed_rate
+        self.random = random.Random(seed)
+        self.calls = 0
+        self.malformed = 0
+
+    async def ainvoke(self, messages: List[Any], **kwargs) -> AIMessage:
+        self.calls += 1
+        text = self._respond(messages)
+        delay = self._first_token_delay()
+        if self.tokens_per_second:
+            delay += len(text.split(" ")) / self.tokens_per_second
+        await asyncio.sleep(delay)
+        return AIMessage(content=text, usage_metadata=self._usage(messages, text))
+
+    async def astream(self, messages: List[Any], **kwargs):
+        self.calls += 1
+        text = self._respond(messages)
+        await asyncio.sleep(self._first_token_delay())
+        for token in text.split(" "):
+            await asyncio.sleep(self.token_delay)
+            yield AIMessageChunk(content=token + " ")
+
+    def _first_token_delay(self) -> float:
+        if self.distribution == "uniform":
+            return max(0.0, self.random.uniform(self.latency - self.jitter, self.latency + self.jitter))
+        if self.distribution == "lognormal" and self.latency > 0:
+            return self.random.lognormvariate(0.0, self.jitter) * self.latency
+        return self.latency
+
+    def _usage(self, messages: List[Any], text: str) -> dict:
+        prompt_tokens = sum(len(str(m.content).split()) for m in messages)
+        completion_tokens = len(text.split())
+        return {
+            "input_tokens": prompt_tokens,
+            "output_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens
+        }
+
+    def _respond(self, messages: List[Any]) -> str:
+        prompt = str(messages[-1].content) if messages else ""
+        if "multiple choice" in prompt or "Return JSON" in prompt:
+            match = _COUNT_RE.search(prompt)
+            count = int(match.group(1)) if match else 5
+            batch = self.random.randrange(1_000_000)
+            payload = json.dumps([
+                {
+                    "question": f"Sample question {batch}-{i + 1}?",
+                    "options": ["Alpha", "Beta", "Gamma", "Delta"],
+                    "correct_answer": "Alpha",
+                    "points": 10
+                }
+                for i in range(count)
+            ])
+            if self.malformed_rate and self.random.random() < self.malformed_rate:
+                self.malformed += 1
+                return "Here are your questions:\n```json\n" + payload[: len(payload) // 2]
+            return payload
+        return "Fake teaching content. " * 20
@@ -0,0 +1,100 @@
+"""Local stand-in for the OpenAI chat-completions endpoint.
+
+Answers POST /v1/chat/completions after a fixed latency, and rejects a share
+of requests (or the first few) with 429 so retry behaviour can be exercised
+offline. Streaming
+requests get a server-sent event per word.
+"""
+import asyncio
+import json
+import random
+import time
+
+from aiohttp import web
+
+
+class FakeOpenAIServer:
+    def __init__(
+        self,
+        latency: float = 0.2,
+        rate_limit_ratio: float = 0.0,
+        retry_after: float = 0.0,
+        rate_limit_first: int = 0
+    ):
+        self.latency = latency
+        self.rate_limit_ratio = rate_limit_ratio
+        self.rate_limit_first = rate_limit_first
+        self.retry_after = retry_after
+        self.requests = 0
+        self.rate_limited = 0
+        self.concurrent = 0
+        self.peak_concurrent = 0
+        self._runner: web.AppRunner | None = None
+        self.port = 0
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/v1"
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self._chat_completions)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    async def _chat_completions(self, request: web.Request) -> web.StreamResponse:
+        self.requests += 1
+        body = await request.json()
+        if self.requests <= self.rate_limit_first or random.random() < self.rate_limit_ratio:
+            self.rate_limited += 1
+            headers = {"retry-after": str(self.retry_after)} if self.retry_after else {}
+            return web.json_response(
+                {"error": {"message": "Rate limit reached", "type": "rate_limit_error"}},
+                status=429,
+                headers=headers
+            )
+
+        self.concurrent += 1
+        self.peak_concurrent = max(self.peak_concurrent, self.concurrent)
+        try:
+            await asyncio.sleep(self.latency)
+            content = f"Fake answer to: {body['messages'][-1]['content'][:40]}"
+            if body.get("stream"):
+                return await self._stream(request, body, content)
+            return web.json_response({
+                "id": f"chatcmpl-{self.requests}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "gpt-4"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop"
+                }],
+                "usage": {"prompt_tokens": 10, "completion_tokens": 10, "total_tokens": 20}
+            })
+        finally:
+            self.concurrent -= 1
+
+    async def _stream(self, request: web.Request, body: dict, content: str) -> web.StreamResponse:
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        for word in content.split(" "):
+            chunk = {
+                "id": f"chatcmpl-{self.requests}",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": body.get("model", "gpt-4"),
+                "choices": [{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}]
+            }
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
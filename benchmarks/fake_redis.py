@@ -0,0 +1,36 @@
+import fnmatch
+import time
+from typing import Dict, Iterator, Optional, Tuple
+
+
+class FakeRedis:
+    """In-process stand-in for the subset of redis-py used by RedisStore."""
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[bytes, Optional[float]]] = {}
+
+    def get(self, key: str) -> Optional[bytes]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and time.time() >= expires_at:
+            del self._data[key]
+            return None
+        return value
+
+    def set(self, key: str, value: str, ex: Optional[int] = None) -> bool:
+        expires_at = time.time() + ex if ex else None
+        self._data[key] = (value.encode("utf-8"), expires_at)
+        return True
+
+    def delete(self, *keys: str) -> int:
+        return sum(1 for key in keys if self._data.pop(key, None) is not None)
+
+    def exists(self, key: str) -> int:
+        return int(self.get(key) is not None)
+
+    def scan_iter(self, match: str = "*") -> Iterator[str]:
+        for key in list(self._data):
+            if fnmatch.fnmatchcase(key, match):
+                yield key
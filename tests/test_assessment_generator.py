@@ -0,0 +1,52 @@
+import asyncio
+import json
+
+import pytest
+from langchain_core.messages import AIMessage
+
+from app.assessment_generator import AssessmentGenerator, AssessmentGenerationError
+from app.models import AssessmentGenerationRequest
+
+
+def mcq(n):
+    return {
+        "question": f"Question number {n} about decorators?",
+        "options": ["A wrapper", "A loop", "A class", "A module"],
+        "correct_answer": "A wrapper",
+        "points": 10,
+    }
+
+
+class BatchLLM:
+    """Answers every call with the same fixed batch of questions."""
+
+    def __init__(self, batch):
+        self.batch = batch
+        self.calls = 0
+
+    async def ainvoke(self, messages):
+        self.calls += 1
+        return AIMessage(content=json.dumps(self.batch))
+
+
+def test_full_assessment_has_requested_count():
+    generator = AssessmentGenerator(llm=BatchLLM([mcq(n) for n in range(5)]))
+    request = AssessmentGenerationRequest(topic="decorators", question_count=5)
+    assessment = asyncio.run(generator.generate_assessment(request))
+    assert len(assessment.questions) == 5
+
+
+def test_short_assessment_is_not_returned():
+    llm = BatchLLM([mcq(1), mcq(2)])
+    generator = AssessmentGenerator(llm=llm)
+    request = AssessmentGenerationRequest(topic="decorators", question_count=5)
+    with pytest.raises(AssessmentGenerationError):
+        asyncio.run(generator.generate_assessment(request))
+    assert llm.calls == 3
+
+
+def test_step_questions_may_come_up_short():
+    generator = AssessmentGenerator(llm=BatchLLM([mcq(1)]))
+    step = {"step_number": 1, "title": "Intro", "content": "Decorators wrap functions."}
+    questions = asyncio.run(generator.generate_step_questions("decorators", step, 2))
+    assert len(questions) == 1
@@ -0,0 +1,142 @@
+import os
+import sys
+import threading
+
+import pytest
+
+from app.code_runner import CodeRunner
+
+ADD = "def add(a, b):\n    return a + b\n"
+
+
+@pytest.fixture
+def runner():
+    runner = CodeRunner(workers=1, timeout=2.0, memory_mb=128, isolation=False)
+    yield runner
+    runner.close()
+
+
+@pytest.fixture(scope="module")
+def isolated():
+    # Isolated children drop to an unprivileged user, who must be able to read
+    # the interpreter; CODE_RUNNER_PYTHON picks one when sys.executable is not.
+    runner = CodeRunner(workers=1, timeout=5.0, python=os.getenv("CODE_RUNNER_PYTHON") or None)
+    probe = runner.run("import socket\nx = 1", [{"expression": "x", "expected": 1}])
+    if probe["error"] or probe["passed"] != 1:
+        runner.close()
+        pytest.skip("isolation not available here: %s" % probe["error"])
+    yield runner
+    runner.close()
+
+
+def test_all_case_kinds_pass(runner):
+    result = runner.run(ADD, [
+        {"function": "add", "args": [1, 2], "expected": 3},
+        {"call": "add(2, 2)", "expected": 4},
+        {"assert": "add(0, 0) == 0"},
+        {"assert": "add(1, 1) > 1"},
+    ])
+    assert (result["passed"], result["total"], result["error"]) == (4, 4, None)
+
+
+def test_custom_eq_cannot_spoof_verdict(runner):
+    code = "class A:\n    def __eq__(self, other):\n        return True\n\ndef f():\n    return A()\n"
+    result = runner.run(code, [
+        {"function": "f", "expected": 42},
+        {"call": "f()", "expected": 42},
+        {"assert": "f() == 42"},
+        {"assert": "42 == f()"},
+    ])
+    assert result["passed"] == 0
+
+
+def test_types_must_match(runner):
+    code = "def f(x):\n    return x\n"
+    result = runner.run(code, [
+        {"function": "f", "args": [True], "expected": 1},
+        {"function": "f", "args": ["1"], "expected": 1},
+        {"function": "f", "args": [2.0], "expected": 2},
+        {"call": "tuple([1, 2])", "expected": [1, 2]},
+    ])
+    assert [r["passed"] for r in result["results"]] == [False, False, True, True]
+
+
+def test_time_limit(runner):
+    result = runner.run("while True:\n    pass\n", [{"assert": "True"}])
+    assert result["passed"] == 0
+    assert result["error"] in ("Time limit exceeded", "CPU time limit exceeded")
+
+
+def test_memory_limit(runner):
+    result = runner.run("x = bytearray(512 * 1024 * 1024)", [{"assert": "True"}])
+    assert result["passed"] == 0
+    assert "MemoryError" in result["error"] or "memory" in result["error"]
+
+
+def test_results_are_cached(runner):
+    code = "import random\nVALUE = random.random()\n"
+    first = runner.run(code, [{"assert": "VALUE < 2"}])
+    assert runner.run(code, [{"assert": "VALUE < 2"}]) is first
+
+
+def test_killed_worker_does_not_hang_waiters_and_is_not_cached(runner):
+    kill = "import os\nos.kill(os.getppid(), 9)\n"
+    results = {}
+
+    def grade(name, code):
+        results[name] = runner.run(code, [{"function": "add", "args": [1, 1], "expected": 2}])
+
+    threads = [threading.Thread(target=grade, args=("kill", kill))]
+    threads[0].start()
+    threads.append(threading.Thread(target=grade, args=("add", ADD)))
+    threads[1].start()
+    for thread in threads:
+        thread.join(timeout=15)
+    assert not any(thread.is_alive() for thread in threads)
+
+    assert results["kill"]["error"] == "Grading worker crashed"
+    assert results["add"]["passed"] == 1
+    assert runner.run(kill, [{"function": "add", "args": [1, 1], "expected": 2}]) is not results["kill"]
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="isolation needs Linux")
+def test_isolation_hides_environment(isolated, monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-secret")
+    result = isolated.run("import os\nKEYS = sorted(os.environ)\n", [{"assert": "'OPENAI_API_KEY' not in KEYS"}])
+    assert result["passed"] == 1
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="isolation needs Linux")
+def test_isolation_blocks_file_writes_and_hides_server_files(isolated):
+    code = (
+        "import os\n"
+        "def write(path):\n"
+        "    try:\n"
+        "        with open(path, 'w') as f:\n"
+        "            f.write('x')\n"
+        "        return True\n"
+        "    except OSError:\n"
+        "        return False\n"
+    )
+    result = isolated.run(code, [
+        {"call": "write('/tmp/tutor-escape.txt')", "expected": False},
+        {"call": "write('scratch.txt')", "expected": True},
+        {"call": "os.path.exists(%r)" % os.path.abspath("app"), "expected": False},
+    ])
+    assert result["passed"] == 3
+    assert not os.path.exists("/tmp/tutor-escape.txt")
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="isolation needs Linux")
+def test_isolation_has_no_network(isolated):
+    code = (
+        "import socket\n"
+        "def connect():\n"
+        "    try:\n"
+        "        socket.create_connection(('1.1.1.1', 53), timeout=1)\n"
+        "        return True\n"
+        "    except OSError:\n"
+        "        return False\n"
+    )
+    result = isolated.run(code, [{"call": "connect()", "expected": False}])
+    assert result["passed"] == 1
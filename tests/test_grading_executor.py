@@ -0,0 +1,55 @@
+import asyncio
+
+from app.grader import Grader, GradingKey
+from app.grading_executor import GradingExecutor
+from app.models import AssessmentSubmission
+
+
+class FailingGrader(Grader):
+    def grade_with_key(self, key, submission):
+        raise RuntimeError("answer key is corrupt")
+
+
+def submission():
+    return AssessmentSubmission(assessment_id="a1", answers=[])
+
+
+def key():
+    return GradingKey("a1", 10.0, 0.7, [])
+
+
+def test_background_failure_is_recorded_and_reported():
+    executor = GradingExecutor(FailingGrader())
+    reports, errors = [], []
+
+    async def main():
+        executor.submit_background(key(), submission(), reports.append, errors.append)
+        assert executor.is_pending("a1")
+        await asyncio.gather(*executor._background)
+
+    asyncio.run(main())
+    executor.shutdown()
+
+    assert reports == []
+    assert errors == ["RuntimeError: answer key is corrupt"]
+    assert not executor.is_pending("a1")
+    assert executor.failure("a1") == errors[0]
+    assert executor.stats()["failed_background"] == 1
+    assert executor.depth == 0
+
+
+def test_resubmitting_clears_the_failure():
+    executor = GradingExecutor(FailingGrader())
+
+    async def main():
+        executor.submit_background(key(), submission(), lambda report: None)
+        await asyncio.gather(*executor._background)
+        assert executor.failure("a1") is not None
+        executor.grader = Grader()
+        executor.submit_background(key(), submission(), lambda report: None)
+        assert executor.failure("a1") is None
+        await asyncio.gather(*executor._background)
+
+    asyncio.run(main())
+    executor.shutdown()
+    assert executor.failure("a1") is None
@@ -0,0 +1,336 @@
+import asyncio
+import time
+
+import httpx
+import openai
+import pytest
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage
+
+from app.llm_gateway import LLMGateway, TokenBucket
+from benchmarks.fake_openai_server import FakeOpenAIServer
+
+REQUEST = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+
+
+def rate_limit_error(retry_after=None):
+    headers = {"retry-after": str(retry_after)} if retry_after is not None else {}
+    response = httpx.Response(429, headers=headers, request=REQUEST)
+    return openai.RateLimitError("rate limited", response=response, body=None)
+
+
+def server_error():
+    return openai.InternalServerError("unavailable", response=httpx.Response(503, request=REQUEST), body=None)
+
+
+def auth_error():
+    return openai.AuthenticationError("bad key", response=httpx.Response(401, request=REQUEST), body=None)
+
+
+class ScriptedLLM:
+    """Fake chat model: raises the scripted errors in order, then answers.
+
+    gate, when set, holds every call until it is opened, and the peak number
+    of calls waiting on it is recorded.
+    """
+
+    def __init__(self, errors=(), gate=None, chunks=("a", "b", "c"), fail_after_chunk=None):
+        self.errors = list(errors)
+        self.gate = gate
+        self.chunks = chunks
+        self.fail_after_chunk = fail_after_chunk
+        self.calls = 0
+        self.active = 0
+        self.peak = 0
+
+    async def _enter(self):
+        self.calls += 1
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            if self.gate is not None:
+                await self.gate.wait()
+            if self.errors:
+                raise self.errors.pop(0)
+        finally:
+            self.active -= 1
+
+    async def ainvoke(self, messages, **kwargs):
+        await self._enter()
+        return AIMessage(content=f"answer {self.calls}")
+
+    async def astream(self, messages, **kwargs):
+        await self._enter()
+        for chunk in self.chunks:
+            yield AIMessageChunk(content=chunk)
+            if self.fail_after_chunk is not None:
+                raise self.fail_after_chunk
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    # Records the gateway's backoff delays without actually waiting.
+    recorded = []
+    real_sleep = asyncio.sleep
+
+    async def fake_sleep(delay, *args, **kwargs):
+        recorded.append(delay)
+        await real_sleep(0)
+
+    monkeypatch.setattr(asyncio, "sleep", fake_sleep)
+    return recorded
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def messages(text="hello"):
+    return [HumanMessage(content=text)]
+
+
+async def make_gateway(**kwargs):
+    return LLMGateway(**kwargs)
+
+
+def test_retry_after_header_sets_the_delay(sleeps):
+    async def scenario():
+        gateway = await make_gateway(max_retries=3, max_delay=20.0)
+        llm = ScriptedLLM(errors=[rate_limit_error(retry_after=3), rate_limit_error(retry_after=100)])
+        result = await gateway.wrap(llm, "gpt-4").ainvoke(messages())
+        await gateway.aclose()
+        return result, llm
+
+    result, llm = run(scenario())
+
+    assert result.content == "answer 3"
+    assert llm.calls == 3
+    assert sleeps == [3.0, 20.0]
+
+
+def test_full_jitter_retries_stop_at_max_retries(sleeps):
+    async def scenario():
+        gateway = await make_gateway(max_retries=3, base_delay=0.5, max_delay=20.0)
+        llm = ScriptedLLM(errors=[server_error() for _ in range(10)])
+        with pytest.raises(openai.InternalServerError):
+            await gateway.wrap(llm, "gpt-4").ainvoke(messages())
+        await gateway.aclose()
+        return gateway, llm
+
+    gateway, llm = run(scenario())
+
+    assert llm.calls == 4
+    assert len(sleeps) == 3
+    for attempt, delay in enumerate(sleeps, start=1):
+        assert 0 <= delay <= 0.5 * 2 ** attempt
+    assert gateway.stats["retries"] == 3
+    assert gateway.stats["failures"] == 1
+
+
+def test_non_retryable_errors_are_not_retried(sleeps):
+    async def scenario():
+        gateway = await make_gateway(max_retries=3)
+        llm = ScriptedLLM(errors=[auth_error()])
+        with pytest.raises(openai.AuthenticationError):
+            await gateway.wrap(llm, "gpt-4").ainvoke(messages())
+        await gateway.aclose()
+        return llm
+
+    llm = run(scenario())
+
+    assert llm.calls == 1
+    assert sleeps == []
+
+
+def test_identical_in_flight_calls_are_coalesced():
+    async def scenario():
+        gateway = await make_gateway()
+        gate = asyncio.Event()
+        llm = ScriptedLLM(gate=gate)
+        handle = gateway.wrap(llm, "gpt-4")
+        first = asyncio.create_task(handle.ainvoke(messages()))
+        second = asyncio.create_task(handle.ainvoke(messages()))
+        other = asyncio.create_task(handle.ainvoke(messages("something else")))
+        await asyncio.sleep(0)
+        gate.set()
+        results = await asyncio.gather(first, second, other)
+        await gateway.aclose()
+        return gateway, llm, results
+
+    gateway, llm, (first, second, other) = run(scenario())
+
+    assert llm.calls == 2
+    assert first is second
+    assert other is not first
+    assert gateway.stats["coalesced"] == 1
+
+
+def test_waiter_makes_its_own_call_when_the_leader_is_cancelled():
+    async def scenario():
+        gateway = await make_gateway()
+        gate = asyncio.Event()
+        llm = ScriptedLLM(gate=gate)
+        handle = gateway.wrap(llm, "gpt-4")
+        leader = asyncio.create_task(handle.ainvoke(messages()))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(handle.ainvoke(messages()))
+        await asyncio.sleep(0)
+        leader.cancel()
+        await asyncio.sleep(0)
+        gate.set()
+        result = await waiter
+        await gateway.aclose()
+        return llm, leader, result
+
+    llm, leader, result = run(scenario())
+
+    assert leader.cancelled()
+    assert result.content == "answer 2"
+    assert llm.calls == 2
+
+
+def test_cancelled_waiter_does_not_cancel_the_leader():
+    async def scenario():
+        gateway = await make_gateway()
+        gate = asyncio.Event()
+        llm = ScriptedLLM(gate=gate)
+        handle = gateway.wrap(llm, "gpt-4")
+        leader = asyncio.create_task(handle.ainvoke(messages()))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(handle.ainvoke(messages()))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.sleep(0)
+        gate.set()
+        result = await leader
+        await gateway.aclose()
+        return llm, waiter, result
+
+    llm, waiter, result = run(scenario())
+
+    assert waiter.cancelled()
+    assert result.content == "answer 1"
+    assert llm.calls == 1
+
+
+def test_global_concurrency_limit():
+    async def scenario():
+        gateway = await make_gateway(max_concurrency=2)
+        gate = asyncio.Event()
+        llm = ScriptedLLM(gate=gate)
+        handle = gateway.wrap(llm, "gpt-4")
+        tasks = [asyncio.create_task(handle.ainvoke(messages(str(i)))) for i in range(5)]
+        for _ in range(5):
+            await asyncio.sleep(0)
+        in_flight = llm.active
+        gate.set()
+        await asyncio.gather(*tasks)
+        await gateway.aclose()
+        return llm, in_flight
+
+    llm, in_flight = run(scenario())
+
+    assert in_flight == 2
+    assert llm.peak == 2
+    assert llm.calls == 5
+
+
+def test_per_model_limit_applies_on_top_of_the_global_one():
+    async def scenario():
+        gateway = await make_gateway(max_concurrency=10, model_concurrency={"gpt-4": 1})
+        gate = asyncio.Event()
+        limited = ScriptedLLM(gate=gate)
+        unlimited = ScriptedLLM(gate=gate)
+        tasks = [
+            asyncio.create_task(gateway.wrap(limited, "gpt-4").ainvoke(messages(f"a{i}")))
+            for i in range(3)
+        ] + [
+            asyncio.create_task(gateway.wrap(unlimited, "gpt-4o-mini").ainvoke(messages(f"b{i}")))
+            for i in range(3)
+        ]
+        for _ in range(5):
+            await asyncio.sleep(0)
+        in_flight = (limited.active, unlimited.active)
+        gate.set()
+        await asyncio.gather(*tasks)
+        await gateway.aclose()
+        return limited, unlimited, in_flight
+
+    limited, unlimited, in_flight = run(scenario())
+
+    assert in_flight == (1, 3)
+    assert limited.peak == 1
+    assert unlimited.peak == 3
+
+
+def test_stream_is_retried_before_the_first_chunk(sleeps):
+    async def scenario():
+        gateway = await make_gateway(max_retries=2)
+        llm = ScriptedLLM(errors=[rate_limit_error(retry_after=1)])
+        chunks = [chunk.content async for chunk in gateway.wrap(llm, "gpt-4").astream(messages())]
+        await gateway.aclose()
+        return llm, chunks
+
+    llm, chunks = run(scenario())
+
+    assert chunks == ["a", "b", "c"]
+    assert llm.calls == 2
+    assert sleeps == [1.0]
+
+
+def test_stream_is_not_retried_after_the_first_chunk(sleeps):
+    async def scenario():
+        gateway = await make_gateway(max_retries=3)
+        llm = ScriptedLLM(fail_after_chunk=rate_limit_error(retry_after=1))
+        received = []
+        with pytest.raises(openai.RateLimitError):
+            async for chunk in gateway.wrap(llm, "gpt-4").astream(messages()):
+                received.append(chunk.content)
+        await gateway.aclose()
+        return gateway, llm, received
+
+    gateway, llm, received = run(scenario())
+
+    assert received == ["a"]
+    assert llm.calls == 1
+    assert sleeps == []
+    assert gateway.stats["failures"] == 1
+
+
+def test_chat_model_retries_a_real_client_after_retry_after(sleeps, monkeypatch):
+    async def scenario():
+        server = FakeOpenAIServer(latency=0.0, retry_after=2.0, rate_limit_first=1)
+        await server.start()
+        monkeypatch.setenv("OPENAI_API_KEY", "sk-fake")
+        monkeypatch.setenv("OPENAI_BASE_URL", server.base_url)
+        monkeypatch.setenv("OPENAI_API_BASE", server.base_url)
+        gateway = await make_gateway(max_retries=2)
+        try:
+            result = await gateway.chat_model("gpt-4").ainvoke(messages("what is a decorator"))
+        finally:
+            await gateway.aclose()
+            await server.stop()
+        return gateway, server, result
+
+    gateway, server, result = run(scenario())
+
+    assert result.content.startswith("Fake answer to: what is a decorator")
+    assert (server.requests, server.rate_limited) == (2, 1)
+    assert 2.0 in sleeps
+    assert gateway.stats["retries"] == 1
+
+
+def test_token_bucket_allows_a_burst_then_paces_to_the_rate():
+    async def scenario():
+        bucket = TokenBucket(rate=20.0, burst=2)
+        start = time.monotonic()
+        stamps = []
+        for _ in range(4):
+            await bucket.acquire()
+            stamps.append(time.monotonic() - start)
+        return stamps
+
+    stamps = run(scenario())
+
+    assert stamps[1] < 0.02
+    assert stamps[3] >= 0.09
+    assert stamps[3] < 0.5
@@ -0,0 +1,130 @@
+import asyncio
+import re
+
+from langchain_core.messages import AIMessage
+from langgraph.checkpoint.memory import MemorySaver
+
+from app.agent import TutorAgent
+from app.lesson_flight import LessonFlights
+from app.models import Assessment
+
+STEP_DELAYS = {1: 0.05, 2: 0.01, 3: 0.02, 4: 0.3, 5: 0.01}
+
+
+class StepLLM:
+    """Answers each teaching step after a per-step delay and records the steps asked for."""
+
+    model_name = "fake"
+
+    def __init__(self):
+        self.calls = []
+
+    async def ainvoke(self, messages, **kwargs):
+        step = int(re.search(r"step (\d+) of", messages[0].content).group(1))
+        self.calls.append(step)
+        await asyncio.sleep(STEP_DELAYS[step])
+        return AIMessage(content=f"Step {step} content.")
+
+
+class FixedAssessments:
+    async def generate_assessment(self, request):
+        return Assessment(id="a1", topic=request.topic, questions=[], total_points=0)
+
+
+def make_agent(llm):
+    return TutorAgent(
+        llm=llm, assessment_generator=FixedAssessments(), checkpointer=MemorySaver(), max_parallel_steps=5
+    )
+
+
+async def interrupt_after(events, steps):
+    # Stop reading once `steps` steps have arrived, like a dropped connection.
+    seen = []
+    async for event in events:
+        if event["type"] == "tutor.step":
+            seen.append(event["data"]["step_number"])
+            if len(seen) == steps:
+                break
+    await events.aclose()
+    return seen
+
+
+async def cancel_after(coro, seconds):
+    task = asyncio.create_task(coro)
+    await asyncio.sleep(seconds)
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+
+async def collect(events):
+    return [
+        (event["type"], event["data"].get("step_number"))
+        async for event in events
+        if event["type"] != "tutor.step.delta"
+    ]
+
+
+def expected_events():
+    return [("tutor.step", n) for n in range(1, 6)] + [("assessment.ready", None), ("tutor.complete", None)]
+
+
+def test_sequential_resume_generates_only_missing_steps():
+    llm = StepLLM()
+    agent = make_agent(llm)
+
+    async def main():
+        # Steps 1-3 are done and step 4 is being generated when the lesson stops.
+        await cancel_after(collect(agent.stream_teaching("python", "t1")), 0.2)
+        assert await agent.has_checkpoint("t1")
+        llm.calls.clear()
+        return await collect(agent.resume_teaching("t1"))
+
+    assert asyncio.run(main()) == expected_events()
+    assert llm.calls == [4, 5]
+
+
+def test_parallel_resume_regenerates_only_unfinished_steps():
+    llm = StepLLM()
+    agent = make_agent(llm)
+
+    async def main():
+        # Steps 1-3 and 5 finish well before step 4.
+        await cancel_after(collect(agent.stream_teaching("python", "t1", parallel=True)), 0.15)
+        assert await agent.has_checkpoint("t1", parallel=True)
+        llm.calls.clear()
+        return await collect(agent.resume_teaching("t1", parallel=True))
+
+    assert asyncio.run(main()) == expected_events()
+    assert llm.calls == [4]
+
+
+def test_completed_lesson_checkpoint_is_discarded():
+    agent = make_agent(StepLLM())
+    flights = LessonFlights(agent)
+
+    async def main():
+        thread_id, events = flights.join("python", "s1", use_cache=False)
+        await collect(events)
+        await asyncio.sleep(0)
+        return await agent.has_checkpoint(thread_id)
+
+    assert asyncio.run(main()) is False
+
+
+def test_discard_drops_an_abandoned_lesson_checkpoint():
+    agent = make_agent(StepLLM())
+    flights = LessonFlights(agent)
+
+    async def main():
+        thread_id, events = flights.join("python", "s1", use_cache=False)
+        await interrupt_after(events, 1)
+        await asyncio.sleep(0.01)
+        assert await agent.has_checkpoint(thread_id)
+        flights.discard(thread_id)
+        await asyncio.sleep(0.01)
+        return await agent.has_checkpoint(thread_id)
+
+    assert asyncio.run(main()) is False
@@ -0,0 +1,69 @@
+import pytest
+
+from app.topic_index import TopicIndex
+
+SAME = [
+    ("python decorators", "Decorators in Python"),
+    ("python decorators", "How do Python decorators work"),
+    ("python decorators", "python decorator"),
+    ("python decorators", "pyhton decorators"),
+    ("python decorators", "pyhton decorator"),
+    ("react hooks", "react hook"),
+    ("linked lists", "linked list"),
+    ("python dictionaries", "python dictionary"),
+    ("lambda functions", "lamda functions"),
+    ("binary search trees", "binary serach tree"),
+    ("javascript closures", "javascrpit closure"),
+    ("python inheritance", "python inheritence"),
+    ("heap sort", "heap sorts"),
+]
+
+DIFFERENT = [
+    ("http", "https"),
+    ("http requests", "https requests"),
+    ("python 2", "python 3"),
+    ("python2", "python3"),
+    ("java basics", "javascript basics"),
+    ("python classes", "python glasses"),
+    ("sql joins", "nosql joins"),
+    ("merge sort", "quick sort"),
+    ("react state", "react props"),
+    ("binary tree insert", "binary tree invert"),
+    ("parsing json", "passing json"),
+    ("compilation", "computation"),
+    ("binary search", "binary search tree"),
+    ("tcp", "tcps"),
+]
+
+
+@pytest.mark.parametrize("first, second", SAME)
+def test_variants_resolve_to_first_topic(first, second):
+    index = TopicIndex()
+    assert index.resolve(first) == first
+    assert index.resolve(second) == first
+
+
+@pytest.mark.parametrize("first, second", DIFFERENT)
+def test_different_topics_stay_apart(first, second):
+    index = TopicIndex()
+    assert index.resolve(first) == first
+    assert index.resolve(second) == second
+
+
+def test_match_among_many_topics():
+    index = TopicIndex()
+    for word in ["generators", "iterators", "closures", "lists", "sets", "dicts", "classes", "modules"]:
+        index.resolve(f"python {word}")
+    index.resolve("python decorators")
+    assert index.resolve("pyhton decorator") == "python decorators"
+    assert index.stats()["similar_hits"] == 1
+
+
+def test_persisted_index_matches_after_reload(tmp_path):
+    path = str(tmp_path / "topics")
+    index = TopicIndex(path=path)
+    index.resolve("react hooks")
+    index.flush()
+    reloaded = TopicIndex(path=path)
+    assert reloaded.resolve("react hook") == "react hooks"
+    assert reloaded.resolve("Hooks in React") == "react hooks"